@@ -0,0 +1,252 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import patch_vary_headers
+from rest_framework import exceptions
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from api import short_links
+from api.authentication import CachedTokenAuthentication
+from api.cache import (
+    INGREDIENTS,
+    TAGS,
+    acached_response,
+    aconditional_response,
+    amake_etag,
+    is_cacheable,
+    recipe_dependency,
+    recipe_detail_dependencies,
+    recipe_list_dependencies,
+    user_dependency,
+)
+from api.ingredient_index import aget_ingredient_index, search_ingredients
+from api.pagination import RecipeCursorPagination
+from api.serializers import (
+    IngredientSerializer,
+    TagSerializer,
+    aload_subscribed_author_ids,
+)
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from recipes.models import Ingredient, Recipe, Tag
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def read_view(viewset_class, actions):
+    """Асинхронно обрабатывает GET и HEAD, остальное отдает вьюсету.
+
+    Обработчик получает запрос DRF с уже определенным пользователем и
+    возвращает Response. Если он вернул None, а также для запросов
+    не в JSON (Browsable API) и других методов ответ строит обычный
+    синхронный вьюсет. Права доступа не проверяются: обработчики только
+    читают данные, открытые всем.
+    """
+    sync_view = sync_to_async(viewset_class.as_view(actions))
+    methods = {*actions, 'options'}
+    if 'get' in methods:
+        methods.add('head')
+    allow = ', '.join(
+        method.upper()
+        for method in viewset_class.http_method_names
+        if method in methods
+    )
+
+    def decorator(handler):
+        async def view(request, *args, **kwargs):
+            response = None
+            if request.method in READ_METHODS:
+                drf_request = Request(request)
+                if accepts_json(drf_request):
+                    response = await handle(
+                        handler, drf_request, *args, **kwargs
+                    )
+                    if response is not None:
+                        response['Allow'] = allow
+                        patch_vary_headers(response, ('Accept',))
+            if response is None:
+                return await sync_view(request, *args, **kwargs)
+            return response
+
+        view.csrf_exempt = True
+        # Для ReplicaMiddleware: какие действия вьюсета заменяет обработчик.
+        view.cls = viewset_class
+        view.actions = actions
+        return view
+
+    return decorator
+
+
+def accepts_json(request):
+    renderers = [
+        renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+    try:
+        renderer, _ = DefaultContentNegotiation().select_renderer(
+            request, renderers
+        )
+    except exceptions.NotAcceptable:
+        return False
+    return isinstance(renderer, JSONRenderer)
+
+
+async def handle(handler, request, *args, **kwargs):
+    try:
+        user_auth = await CachedTokenAuthentication().aauthenticate(request)
+        request.user, request.auth = user_auth or (AnonymousUser(), None)
+        response = await handler(request, *args, **kwargs)
+    except (exceptions.APIException, Http404) as exc:
+        if isinstance(exc, exceptions.AuthenticationFailed):
+            exc.auth_header = CachedTokenAuthentication.keyword
+        response = exception_handler(exc, {})
+    if not isinstance(response, Response):
+        return response
+    return render(request, response)
+
+
+def render(request, response):
+    """Рендерит Response в JSON прямо в цикле событий.
+
+    Отложенный рендеринг Django выполнил бы его в отдельном потоке.
+    """
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = response.accepted_renderer.media_type
+    response.renderer_context = {'request': request, 'response': response}
+    content = response.rendered_content
+    http_response = HttpResponse(content, status=response.status_code)
+    for header, value in response.items():
+        http_response[header] = value
+    return http_response
+
+
+def get_viewset(viewset_class, request, action, **kwargs):
+    """Создает вьюсет без dispatch(), чтобы взять его queryset и пагинацию."""
+    return viewset_class(
+        request=request,
+        action=action,
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None
+    )
+
+
+@read_view(TagViewSet, {'get': 'list'})
+async def tag_list(request):
+    async def get_response():
+        tags = [tag async for tag in Tag.objects.all()]
+        return Response(TagSerializer(tags, many=True).data)
+
+    etag = await amake_etag(request, TAGS)
+    return await aconditional_response(request, etag, get_response)
+
+
+@read_view(TagViewSet, {'get': 'retrieve'})
+async def tag_detail(request, pk):
+    async def get_response():
+        try:
+            tag = await Tag.objects.aget(pk=pk)
+        except Tag.DoesNotExist:
+            raise Http404
+        return Response(TagSerializer(tag).data)
+
+    etag = await amake_etag(request, TAGS)
+    return await aconditional_response(request, etag, get_response)
+
+
+@read_view(IngredientViewSet, {'get': 'list'})
+async def ingredient_list(request):
+    async def get_response():
+        index = await aget_ingredient_index()
+        return Response(search_ingredients(index, request.query_params))
+
+    etag = await amake_etag(request, INGREDIENTS)
+    return await aconditional_response(request, etag, get_response)
+
+
+@read_view(IngredientViewSet, {'get': 'retrieve'})
+async def ingredient_detail(request, pk):
+    async def get_response():
+        try:
+            ingredient = await Ingredient.objects.aget(pk=pk)
+        except Ingredient.DoesNotExist:
+            raise Http404
+        return Response(IngredientSerializer(ingredient).data)
+
+    etag = await amake_etag(request, INGREDIENTS)
+    return await aconditional_response(request, etag, get_response)
+
+
+@read_view(RecipeViewSet, {'get': 'list', 'post': 'create'})
+async def recipe_list(request):
+    if RecipeCursorPagination.cursor_query_param in request.query_params:
+        return None
+    view = get_viewset(RecipeViewSet, request, 'list')
+
+    # Проверка фильтра по тегам обращается к БД.
+    queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+
+    async def get_response():
+        await aload_subscribed_author_ids(request)
+        # Подсчет количества, страница, теги и ингредиенты загружаются
+        # одним вызовом: асинхронный ORM все равно отправляет каждый
+        # запрос в тот же поток.
+        return await sync_to_async(view.get_page_response)(queryset)
+
+    if is_cacheable(request):
+        get_response = partial(
+            acached_response,
+            request, 'recipes', recipe_list_dependencies(), get_response
+        )
+    etag = await amake_etag(request, *recipe_list_dependencies())
+    return await aconditional_response(request, etag, get_response)
+
+
+@read_view(
+    RecipeViewSet,
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'}
+)
+async def recipe_detail(request, pk):
+    view = get_viewset(RecipeViewSet, request, 'retrieve', pk=pk)
+
+    async def get_response():
+        recipe = await view.get_queryset().filter(pk=pk).afirst()
+        if recipe is None:
+            raise Http404
+        await aload_subscribed_author_ids(request)
+        return Response(view.get_serializer(recipe).data)
+
+    if is_cacheable(request):
+        get_response = partial(
+            acached_response,
+            request, 'recipe', recipe_detail_dependencies(pk), get_response
+        )
+    recipe = await Recipe.objects.filter(pk=pk).values_list(
+        'updated_at', 'author_id'
+    ).afirst()
+    if recipe is None:
+        return await get_response()
+    updated_at, author_id = recipe
+    etag = await amake_etag(
+        request,
+        TAGS, INGREDIENTS,
+        recipe_dependency(pk),
+        user_dependency(author_id),
+        extra=(updated_at,)
+    )
+    return await aconditional_response(request, etag, get_response)
+
+
+async def short_link_redirect(request, code):
+    """Перенаправляет с короткой ссылки на страницу рецепта."""
+    recipe_id = await short_links.resolver.aresolve(code)
+    if recipe_id is None:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}')
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+from api.cache import aget_versions, get_versions, token_dependency
+from users.models import User
+
+# Поля пользователя, которые запоминаются вместе с токеном. Они меняются
+# только через save(), а сигнал сбрасывает запись в кеше. Счетчики
+# (recipes_count, followers_count) обновляются UPDATE-запросами и в кеше
+# устарели бы; в восстановленном пользователе они остаются отложенными,
+# поэтому save() не перезаписывает их старыми значениями. Порядок полей -
+# как в модели: в нем значения ждет from_db().
+USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'password', 'last_login', 'is_superuser', 'username',
+        'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+        'date_joined', 'avatar',
+    }
+]
+TOKEN_FIELDS = [field.attname for field in Token._meta.concrete_fields]
+
+
+class TokenCache:
+    """LRU-кеш процесса: ключ токена -> поля токена и пользователя.
+
+    Запись живет не дольше timeout секунд и хранит версию токена в кеше
+    Django. Выход, смена пароля и деактивация пользователя меняют версию,
+    и запись перечитывается из БД. С общим кешем (memcached) это сразу
+    видят все процессы, с локальным - остальные процессы узнают
+    об изменении по истечении timeout.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, entry_version, expires_at = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, version):
+        with self._lock:
+            self._entries[key] = (
+                data, version, time.monotonic() + self.timeout
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TIMEOUT
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД для уже проверенного токена.
+
+    В кеше лежат значения полей, а не сами объекты: каждый запрос
+    получает свои экземпляры пользователя и токена.
+    """
+
+    def get_key(self, request):
+        """Ключ токена из заголовка Authorization или None."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. No credentials provided.')
+            )
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. '
+                  'Token string should not contain spaces.')
+            )
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. '
+                  'Token string should not contain invalid characters.')
+            )
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    async def aauthenticate(self, request):
+        """Асинхронный вариант authenticate() для ASGI-обработчиков."""
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        dependency = token_dependency(key)
+        # Версия читается до БД, чтобы не закешировать устаревшего
+        # пользователя, если его изменят между этими шагами.
+        version = get_versions([dependency])[dependency]
+        data = token_cache.get(key, version)
+        if data is not None:
+            return self.restore(data)
+        user, token = super().authenticate_credentials(key)
+        self.remember(key, user, token, version)
+        return user, token
+
+    async def aauthenticate_credentials(self, key):
+        dependency = token_dependency(key)
+        version = (await aget_versions([dependency]))[dependency]
+        data = token_cache.get(key, version)
+        if data is not None:
+            return self.restore(data)
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        self.remember(key, token.user, token, version)
+        return token.user, token
+
+    def remember(self, key, user, token, version):
+        token_cache.set(
+            key,
+            (
+                user._state.db,
+                [getattr(user, field) for field in USER_FIELDS],
+                [getattr(token, field) for field in TOKEN_FIELDS],
+            ),
+            version
+        )
+
+    def restore(self, data):
+        db, user_values, token_values = data
+        user = User.from_db(db, USER_FIELDS, user_values)
+        token = Token.from_db(db, TOKEN_FIELDS, token_values)
+        token.user = user
+        return user, token
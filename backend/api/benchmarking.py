@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+class RollbackFixtures(Exception):
+    """Прерывает транзакцию с тестовыми данными."""
+
+
+@contextmanager
+def rolled_back():
+    """Откатывает все, что создано внутри блока.
+
+    Нужен командам-бенчмаркам, которые работают с рабочей БД.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise RollbackFixtures
+    except RollbackFixtures:
+        pass
+
+
+def create_user(username, **kwargs):
+    kwargs.setdefault('first_name', 'Test')
+    kwargs.setdefault('last_name', 'User')
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', **kwargs
+    )
+
+
+def create_tags(count, prefix='tag'):
+    return Tag.objects.bulk_create(
+        Tag(name=f'{prefix}-{i}', slug=f'{prefix}-{i}') for i in range(count)
+    )
+
+
+def create_ingredients(count, prefix='ingredient'):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'{prefix}-{i}', measurement_unit='г')
+        for i in range(count)
+    )
+
+
+def create_recipes(author, count, tags=(), ingredients=(), **kwargs):
+    """Рецепты автора с одинаковыми тегами и ингредиентами."""
+    kwargs.setdefault('image', 'recipes/images/test.png')
+    kwargs.setdefault('text', 'Описание')
+    kwargs.setdefault('cooking_time', 10)
+    recipes = Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'recipe-{i}', **kwargs)
+        for i in range(count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in tags
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    return recipes
+
+
+def make_request(path, user=None, params=None, **extra):
+    """GET-запрос DRF с уже определенным пользователем."""
+    request = Request(APIRequestFactory().get(path, params, **extra))
+    request.user = user or AnonymousUser()
+    return request
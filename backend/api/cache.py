@@ -0,0 +1,245 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+VERSION_KEY = 'cache-version:{}'
+RESPONSE_KEY = 'response:{}:{}'
+STATS_KEY = 'response-cache:{}'
+
+RECIPE_LIST = 'recipe-list'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+
+
+def recipe_dependency(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def user_dependency(user_id):
+    return f'user:{user_id}'
+
+
+def user_state_dependency(user_id):
+    """Избранное, список покупок и подписки пользователя."""
+    return f'user-state:{user_id}'
+
+
+def recipe_list_dependencies():
+    """От чего зависит страница списка рецептов.
+
+    Любое изменение рецепта, его тегов и ингредиентов меняет версию
+    списка, изменение автора - версию пользователей.
+    """
+    return (RECIPE_LIST, TAGS, INGREDIENTS, USERS)
+
+
+def recipe_detail_dependencies(recipe_id):
+    return (recipe_dependency(recipe_id), TAGS, INGREDIENTS, USERS)
+
+
+def token_dependency(key):
+    """Проверка токена авторизации; в ключе кеша только хеш токена."""
+    return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def bump_versions(*dependencies):
+    """Инвалидирует закешированные ответы, зависящие от dependencies."""
+    cache.set_many(
+        {VERSION_KEY.format(name): uuid.uuid4().hex for name in dependencies},
+        settings.CACHE_VERSION_TIMEOUT
+    )
+
+
+def bump_versions_on_commit(*dependencies):
+    transaction.on_commit(lambda: bump_versions(*dependencies))
+
+
+def get_versions(dependencies):
+    """Возвращает текущие версии зависимостей, создавая недостающие."""
+    keys = {VERSION_KEY.format(name): name for name in dependencies}
+    versions = cache.get_many(keys)
+    missing = keys.keys() - versions.keys()
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, settings.CACHE_VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+async def aget_versions(dependencies):
+    """Асинхронный вариант get_versions()."""
+    keys = {VERSION_KEY.format(name): name for name in dependencies}
+    versions = await cache.aget_many(keys)
+    missing = keys.keys() - versions.keys()
+    if missing:
+        for key in missing:
+            await cache.aadd(
+                key, uuid.uuid4().hex, settings.CACHE_VERSION_TIMEOUT
+            )
+        versions.update(await cache.aget_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def record(event):
+    key = STATS_KEY.format(event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+async def arecord(event):
+    key = STATS_KEY.format(event)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=None)
+
+
+def get_stats():
+    """Возвращает счетчики попаданий и промахов кеша ответов."""
+    stats = cache.get_many([STATS_KEY.format('hit'), STATS_KEY.format('miss')])
+    return {
+        'hit': stats.get(STATS_KEY.format('hit'), 0),
+        'miss': stats.get(STATS_KEY.format('miss'), 0),
+    }
+
+
+def get_response_key(request, prefix):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    path = f'{request.get_host()}{request.path}?{query}'
+    return RESPONSE_KEY.format(
+        prefix, hashlib.md5(path.encode('utf-8')).hexdigest()
+    )
+
+
+def is_cacheable(request):
+    return request.method in ('GET', 'HEAD') and request.user.is_anonymous
+
+
+def cached_response(request, prefix, dependencies, get_response):
+    """Отдает ответ для анонимного пользователя из кеша.
+
+    Вместе с данными хранятся версии зависимостей, взятые до построения
+    ответа: если данные изменятся, пока ответ строится, запись сразу
+    окажется устаревшей. Запись считается устаревшей, как только версия
+    хотя бы одной зависимости изменилась.
+    """
+    key = get_response_key(request, prefix)
+    versions = get_versions(dependencies)
+    entry = cache.get(key)
+    if entry is not None and entry[1] == versions:
+        record('hit')
+        response = Response(entry[0])
+        response['X-Cache'] = 'HIT'
+        return response
+
+    record('miss')
+    response = get_response()
+    if response.status_code == 200:
+        cache.set(
+            key,
+            (response.data, versions),
+            settings.RESPONSE_CACHE_TIMEOUT
+        )
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+async def acached_response(request, prefix, dependencies, get_response):
+    """Асинхронный вариант cached_response()."""
+    key = get_response_key(request, prefix)
+    versions = await aget_versions(dependencies)
+    entry = await cache.aget(key)
+    if entry is not None and entry[1] == versions:
+        await arecord('hit')
+        response = Response(entry[0])
+        response['X-Cache'] = 'HIT'
+        return response
+
+    await arecord('miss')
+    response = await get_response()
+    if response.status_code == 200:
+        await cache.aset(
+            key,
+            (response.data, versions),
+            settings.RESPONSE_CACHE_TIMEOUT
+        )
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def get_etag_dependencies(request, dependencies):
+    """Зависимости ETag с учетом состояния пользователя.
+
+    Для авторизованного пользователя добавляется версия его избранного,
+    списка покупок и подписок, от которых зависят флаги в ответе.
+    """
+    if request.user.is_authenticated:
+        dependencies += (user_state_dependency(request.user.id),)
+    return dependencies
+
+
+def build_etag(request, versions, extra):
+    parts = (
+        request.get_full_path(),
+        request.user.id,
+        sorted(versions.items()),
+        extra
+    )
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def make_etag(request, *dependencies, extra=()):
+    """Строит ETag из версий зависимостей без сериализации ответа."""
+    versions = get_versions(get_etag_dependencies(request, dependencies))
+    return build_etag(request, versions, extra)
+
+
+async def amake_etag(request, *dependencies, extra=()):
+    versions = await aget_versions(
+        get_etag_dependencies(request, dependencies)
+    )
+    return build_etag(request, versions, extra)
+
+
+def get_not_modified(request, etag):
+    """Ответ 304, если у клиента актуальная копия, иначе None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_vary_headers(not_modified, ('Authorization',))
+    return not_modified
+
+
+def set_etag(request, response, etag):
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_response(request, etag, get_response):
+    """Отвечает 304, если у клиента актуальная копия, иначе строит ответ."""
+    not_modified = get_not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    return set_etag(request, get_response(), etag)
+
+
+async def aconditional_response(request, etag, get_response):
+    """Асинхронный вариант conditional_response()."""
+    not_modified = get_not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    return set_etag(request, await get_response(), etag)
@@ -1,6 +1,11 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
+from api.pagination import RecipeCursorPagination
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import SEARCH_CONFIG, is_search_supported
 
 
 class IngredientFilter(FilterSet):
@@ -25,10 +30,13 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search'
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -41,3 +49,24 @@ class RecipeFilter(FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(shoppingcarts__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        # Курсор упорядочивает по дате публикации и отбросил бы порядок
+        # по релевантности, поэтому поиск листается только по страницам.
+        cursor_param = RecipeCursorPagination.cursor_query_param
+        if cursor_param in self.request.query_params:
+            raise ValidationError({
+                name: ['Поиск нельзя совмещать с параметром cursor']
+            })
+        if not is_search_supported(queryset.db):
+            return queryset.filter(
+                Q(name__icontains=value)
+                | Q(text__icontains=value)
+                | Q(ingredients__name__icontains=value)
+            ).distinct()
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date', '-id')
@@ -0,0 +1,90 @@
+import threading
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+
+from api.cache import INGREDIENTS, aget_versions, get_versions
+from recipes.models import Ingredient
+
+# Символ больше любого символа названия: граница диапазона по префиксу.
+MAX_CHAR = '\U0010ffff'
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def normalize(name):
+    """Приводит название к виду для сравнения: регистр и ё/е не важны."""
+    return name.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Неизменяемый индекс ингредиентов для поиска по началу названия.
+
+    Ингредиенты отсортированы по нормализованному названию, поэтому
+    совпадения с префиксом образуют непрерывный диапазон, а точные
+    совпадения оказываются в его начале.
+    """
+
+    def __init__(self, ingredients):
+        entries = sorted(
+            (normalize(name), name, ingredient_id, measurement_unit)
+            for ingredient_id, name, measurement_unit in ingredients
+        )
+        self._keys = [entry[0] for entry in entries]
+        self._items = [
+            {'id': ingredient_id, 'name': name, 'measurement_unit': unit}
+            for _, name, ingredient_id, unit in entries
+        ]
+
+    def __len__(self):
+        return len(self._items)
+
+    def search(self, prefix='', limit=None):
+        if not prefix:
+            return self._items[:limit]
+        key = normalize(prefix)
+        start = bisect_left(self._keys, key)
+        end = bisect_left(self._keys, key + MAX_CHAR, lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self._items[start:end]
+
+
+def search_ingredients(index, params):
+    """Ищет в индексе по параметрам запроса name и limit."""
+    limit = params.get('limit')
+    limit = int(limit) if limit and limit.isdigit() else None
+    return index.search(params.get('name', ''), limit)
+
+
+def get_ingredient_index():
+    """Возвращает индекс процесса, перестраивая его после изменений."""
+    return build_index(get_versions([INGREDIENTS])[INGREDIENTS])
+
+
+async def aget_ingredient_index():
+    """Асинхронный вариант get_ingredient_index().
+
+    Пока индекс актуален, обращения к БД нет; перестройка выполняется
+    в потоке, как и остальные запросы асинхронного ORM.
+    """
+    version = (await aget_versions([INGREDIENTS]))[INGREDIENTS]
+    if _index is not None and version == _index_version:
+        return _index
+    return await sync_to_async(build_index)(version)
+
+
+def build_index(version):
+    global _index, _index_version
+    if _index is None or version != _index_version:
+        with _lock:
+            if _index is None or version != _index_version:
+                _index = IngredientIndex(
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    )
+                )
+                _index_version = version
+    return _index
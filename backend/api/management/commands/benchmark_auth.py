@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from api.benchmarking import create_user, make_request, rolled_back
+
+DEFAULT_REQUESTS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request cost of token authentication with and without '
+        'the in-process token cache. Fixture data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=DEFAULT_REQUESTS,
+            help=f'Requests per authentication class '
+                 f'(default {DEFAULT_REQUESTS})'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with rolled_back():
+                token = Token.objects.create(
+                    user=create_user('benchmark-auth')
+                )
+                results = [
+                    self.measure(
+                        authentication, token.key, options['requests']
+                    )
+                    for authentication in (
+                        TokenAuthentication, CachedTokenAuthentication
+                    )
+                ]
+        finally:
+            token_cache.clear()
+
+        (_, base_queries, base_time), (_, queries, elapsed) = results
+        for name, query_count, seconds in results:
+            self.stdout.write(
+                f'{name}: {query_count / options["requests"]:.2f} '
+                f'queries/request, '
+                f'{seconds / options["requests"] * 1e6:.0f} us/request'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Saved {base_queries - queries} queries and '
+                f'{(base_time - elapsed) * 1e3:.0f} ms on '
+                f'{options["requests"]} requests'
+            )
+        )
+
+    def measure(self, authentication_class, key, requests):
+        token_cache.clear()
+        authentication = authentication_class()
+        request = make_request(
+            '/api/users/me/', HTTP_AUTHORIZATION=f'Token {key}'
+        )
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(requests):
+                authentication.authenticate(request)
+            elapsed = time.perf_counter() - started
+        return authentication_class.__name__, len(context), elapsed
@@ -0,0 +1,105 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from api.async_views import get_viewset
+from api.benchmarking import (
+    create_ingredients,
+    create_recipes,
+    create_tags,
+    create_user,
+    make_request,
+    rolled_back,
+)
+from api.representations import get_recipe_rows, represent_recipes
+from api.views import RecipeViewSet
+
+DEFAULT_PAGES = 200
+INGREDIENTS_PER_RECIPE = 8
+TAGS_PER_RECIPE = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the cost of rendering a recipe list page with '
+        'RecipeSerializer and with the fast representation. '
+        'Fixture data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=DEFAULT_PAGES,
+            help=f'Pages rendered per implementation (default {DEFAULT_PAGES})'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=settings.PAGE_SIZE,
+            help=f'Recipes per page (default {settings.PAGE_SIZE}, '
+                 f'max {settings.MAX_PAGE_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        pages = options['pages']
+        limit = min(options['limit'], settings.MAX_PAGE_SIZE)
+        # Запрос собирается как в тестах, с хостом testserver.
+        with rolled_back(), override_settings(ALLOWED_HOSTS=['testserver']):
+            user = create_user('benchmark-reader')
+            create_recipes(
+                user,
+                limit,
+                create_tags(TAGS_PER_RECIPE, 'benchmark-tag'),
+                create_ingredients(
+                    INGREDIENTS_PER_RECIPE, 'benchmark-ingredient'
+                ),
+                image_webp='recipes/images/webp/benchmark.webp',
+                thumbnail='recipes/images/thumbnails/benchmark.jpg',
+                thumbnail_webp='recipes/images/thumbnails/benchmark.webp',
+            )
+            request = make_request('/api/recipes/', user)
+            view = get_viewset(RecipeViewSet, request, 'list')
+            queryset = view.get_queryset()
+            results = [
+                self.measure(
+                    'RecipeSerializer',
+                    lambda: view.get_serializer(
+                        queryset[:limit], many=True
+                    ).data,
+                    pages
+                ),
+                self.measure(
+                    'represent_recipes',
+                    lambda: represent_recipes(
+                        get_recipe_rows(queryset)[:limit], request
+                    ),
+                    pages
+                ),
+            ]
+
+        for name, query_count, seconds in results:
+            self.stdout.write(
+                f'{name}: {query_count / pages:.0f} queries/page, '
+                f'{seconds / pages * 1e3:.2f} ms/page '
+                f'({limit} recipes)'
+            )
+        (_, _, base_time), (_, _, elapsed) = results
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Fast representation is {base_time / elapsed:.1f}x faster'
+            )
+        )
+
+    def measure(self, name, get_data, pages):
+        renderer = JSONRenderer()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(pages):
+                renderer.render(get_data())
+            elapsed = time.perf_counter() - started
+        return name, len(context), elapsed
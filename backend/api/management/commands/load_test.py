@@ -0,0 +1,114 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+)
+DEFAULT_CONCURRENCY = 32
+DEFAULT_DURATION = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent GET requests to a running server and report '
+        'throughput and latency percentiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'base_url', help='Server address, e.g. http://localhost:8000'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Path to request, may be repeated '
+                 f'(default {", ".join(DEFAULT_PATHS)})'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help=f'Simultaneous clients (default {DEFAULT_CONCURRENCY})'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=DEFAULT_DURATION,
+            help=f'Test duration in seconds (default {DEFAULT_DURATION})'
+        )
+        parser.add_argument(
+            '--token', help='Authorization token for authenticated requests'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be positive.')
+        base_url = options['base_url'].rstrip('/')
+        urls = [
+            base_url + path for path in options['paths'] or DEFAULT_PATHS
+        ]
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        try:
+            requests.get(urls[0], headers=headers, timeout=10)
+        except requests.RequestException as error:
+            raise CommandError(f'Server is not reachable: {error}')
+
+        deadline = time.perf_counter() + options['duration']
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def client(number):
+            # У каждого клиента своя сессия с keep-alive, как у браузера.
+            session = requests.Session()
+            session.headers.update(headers)
+            index = number
+            while time.perf_counter() < deadline:
+                url = urls[index % len(urls)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    status = session.get(url, timeout=30).status_code
+                except requests.RequestException as error:
+                    status = type(error).__name__
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if status == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors.append(status)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            list(executor.map(client, range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+
+        if not latencies:
+            raise CommandError(f'No successful requests, errors: {errors[:5]}')
+        latencies.sort()
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{len(latencies)} requests, {len(errors)} errors '
+            f'in {elapsed:.1f} s, concurrency {options["concurrency"]}'
+        )
+        self.stdout.write(
+            'latency ms: '
+            f'p50 {percentiles[49] * 1e3:.1f}, '
+            f'p95 {percentiles[94] * 1e3:.1f}, '
+            f'p99 {percentiles[98] * 1e3:.1f}, '
+            f'max {latencies[-1] * 1e3:.1f}'
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'{len(latencies) / elapsed:.0f} requests/s')
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the anonymous response cache'
+
+    def handle(self, *args, **kwargs):
+        stats = get_stats()
+        total = stats['hit'] + stats['miss']
+        ratio = stats['hit'] / total * 100 if total else 0
+        self.stdout.write(
+            f'hits: {stats["hit"]}, misses: {stats["miss"]}, '
+            f'hit ratio: {ratio:.1f}%'
+        )
@@ -1,11 +1,122 @@
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
+COUNT_CACHE_KEY = 'pagination-count:{}'
+
+
+def get_count_cache_key(model):
+    return COUNT_CACHE_KEY.format(model._meta.label_lower)
+
+
+def invalidate_count_cache(*models):
+    """Сбрасывает закешированное количество объектов моделей."""
+    cache.delete_many([get_count_cache_key(model) for model in models])
+
+
+def estimate_table_count(queryset):
+    """Оценивает число строк таблицы по статистике планировщика PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedPage(Page):
+    """Страница, которая знает о наличии следующей без точного количества."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с дешевым подсчетом количества для неотфильтрованных списков.
+
+    Количество строк всей таблицы кешируется, а для больших таблиц берется
+    из статистики планировщика. Отфильтрованные выборки считаются точно.
+    """
+
+    @cached_property
+    def _count_info(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return len(queryset), True
+        if queryset.query.where:
+            return queryset.count(), True
+
+        key = get_count_cache_key(queryset.model)
+        count_info = cache.get(key)
+        if count_info is None:
+            estimate = estimate_table_count(queryset)
+            if (
+                estimate is not None
+                and estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD
+            ):
+                count_info = (estimate, False)
+            else:
+                count_info = (queryset.count(), True)
+            cache.set(
+                key, count_info, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+            )
+        return count_info
+
+    @cached_property
+    def count(self):
+        return self._count_info[0]
+
+    @property
+    def count_exact(self):
+        return self._count_info[1]
+
+    def validate_number(self, number):
+        if self.count_exact:
+            return super().validate_number(number)
+        # Оценка может быть занижена, поэтому верхнюю границу не проверяем.
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if self.count_exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        return EstimatedPage(
+            object_list[:self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page
+        )
+
 
 class CustomPagination(PageNumberPagination):
     """Кастомный класс пагинации с настраиваемым размером страницы."""
 
+    django_paginator_class = EstimatedCountPaginator
     page_size = settings.PAGE_SIZE
     page_size_query_param = settings.PAGE_SIZE_QUERY_PARAM
     max_page_size = settings.MAX_PAGE_SIZE
@@ -13,7 +124,30 @@ class CustomPagination(PageNumberPagination):
     def get_paginated_response(self, data):
         return Response({
             'count': self.page.paginator.count,
+            'count_exact': self.page.paginator.count_exact,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'results': data
         })
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация ленты рецептов без подсчета общего количества.
+
+    Включается передачей параметра cursor (пустого для первой страницы).
+    """
+
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = settings.PAGE_SIZE_QUERY_PARAM
+    max_page_size = settings.MAX_PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+    """Курсорная (keyset) пагинация ленты подписок.
+
+    Курсор хранит дату публикации последнего рецепта, так что следующая
+    страница читается по индексу без OFFSET.
+    """
+
+    ordering = ('-feed_pub_date', '-id')
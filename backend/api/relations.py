@@ -0,0 +1,105 @@
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+CREATE_RELATION_SQL = '''
+    INSERT INTO {table} ({user_column}, {target_column})
+    SELECT %s, {target_pk} FROM {target_table}
+    WHERE {target_pk} IN ({target_ids})
+    ON CONFLICT ({user_column}, {target_column}) DO NOTHING
+    RETURNING {target_column}
+'''
+
+DELETE_RELATIONS_SQL = '''
+    DELETE FROM {table}
+    WHERE {user_column} = %s AND {target_column} IN ({target_ids})
+    RETURNING {target_column}
+'''
+
+INCREMENT_SQL = '''
+    UPDATE {table} SET {field} = {field} + 1
+    WHERE {pk} = %s
+    RETURNING *
+'''
+
+
+def create_relations(model_class, user_id, target_field, target_ids):
+    """Создает связи пользователя с объектами одним запросом.
+
+    Конфликт с уникальным ограничением (user, target_field) гасится в
+    ON CONFLICT DO NOTHING, поэтому повторные и одновременные запросы
+    не падают. Возвращает множество id объектов, связи с которыми
+    созданы: уже существующие связи и несуществующие объекты в него
+    не попадают.
+    """
+    target_ids = list(target_ids)
+    if not target_ids:
+        return set()
+    target = model_class._meta.get_field(target_field)
+    target_model = target.related_model
+    sql = CREATE_RELATION_SQL.format(
+        table=model_class._meta.db_table,
+        user_column=model_class._meta.get_field('user').column,
+        target_column=target.column,
+        target_table=target_model._meta.db_table,
+        target_pk=target_model._meta.pk.column,
+        target_ids=', '.join(['%s'] * len(target_ids)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *target_ids])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_relation(model_class, user_id, target_field, target_id):
+    """Создает одну связь; False, если она уже была или объекта нет."""
+    return bool(
+        create_relations(model_class, user_id, target_field, [target_id])
+    )
+
+
+def delete_relations(model_class, user_id, target_field, target_ids):
+    """Удаляет связи пользователя с объектами одним запросом.
+
+    Как и при создании, сигналы не отправляются: счетчики обновляет
+    вызывающий код. Возвращает множество id объектов, связи с которыми
+    удалены.
+    """
+    target_ids = list(target_ids)
+    if not target_ids:
+        return set()
+    sql = DELETE_RELATIONS_SQL.format(
+        table=model_class._meta.db_table,
+        user_column=model_class._meta.get_field('user').column,
+        target_column=model_class._meta.get_field(target_field).column,
+        target_ids=', '.join(['%s'] * len(target_ids)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *target_ids])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def delete_relation(model_class, user_id, target_field, target_id):
+    """Удаляет одну связь; False, если ее не было."""
+    return bool(
+        delete_relations(model_class, user_id, target_field, [target_id])
+    )
+
+
+def update_counter(model_class, pk, field, delta):
+    """Атомарно изменяет денормализованный счетчик объекта."""
+    model_class.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def increment_counter(model_class, pk, field):
+    """Увеличивает счетчик на 1 и возвращает обновленный объект.
+
+    UPDATE ... RETURNING заменяет отдельный запрос за объектом для ответа.
+    """
+    sql = INCREMENT_SQL.format(
+        table=model_class._meta.db_table,
+        field=model_class._meta.get_field(field).column,
+        pk=model_class._meta.pk.column,
+    )
+    return next(iter(model_class.objects.raw(sql, [pk])), None)
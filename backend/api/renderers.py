@@ -0,0 +1,34 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер выгрузки списка покупок.
+
+    Сам файл формирует представление в виде потока, рендерер выбирает
+    формат по параметру format или заголовку Accept и отображает ошибки.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
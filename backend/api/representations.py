@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+
+from api.serializers import get_subscribed_author_ids
+from recipes.images import VARIANTS
+from recipes.models import RecipeIngredient, Tag
+
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'email', 'avatar')
+RECIPE_FIELDS = (
+    'id', 'author_id', 'name', 'image', *VARIANTS, 'text', 'cooking_time',
+    'pub_date', *(f'author__{field}' for field in AUTHOR_FIELDS)
+)
+
+
+def get_recipe_rows(queryset):
+    """Строки рецептов с авторами для represent_recipes().
+
+    Аннотации queryset (is_favorited, поля курсора ленты) попадают
+    в строки, поэтому их можно передавать в пагинацию вместо моделей.
+    """
+    return queryset.prefetch_related(None).values(
+        *RECIPE_FIELDS, *queryset.query.annotations
+    )
+
+
+def get_media_url(request):
+    """Абсолютный адрес MEDIA_URL, вычисляется один раз на ответ.
+
+    Для файлового хранилища ссылка на файл - это base_url и
+    экранированное имя, как в FileSystemStorage.url().
+    """
+    return request.build_absolute_uri(default_storage.base_url)
+
+
+def get_file_url(media_url, name):
+    if not name:
+        return None
+    return media_url + filepath_to_uri(name).lstrip('/')
+
+
+def get_tags(recipe_ids):
+    """Теги рецептов в порядке prefetch_related('tags')."""
+    tags = defaultdict(list)
+    rows = Tag.objects.filter(recipes__in=recipe_ids).values_list(
+        'recipes', 'id', 'name', 'slug'
+    )
+    for recipe_id, tag_id, name, slug in rows:
+        tags[recipe_id].append({'id': tag_id, 'name': name, 'slug': slug})
+    return tags
+
+
+def get_ingredients(recipe_ids):
+    """Ингредиенты рецептов тем же запросом, что и prefetch во вьюсете."""
+    ingredients = defaultdict(list)
+    rows = RecipeIngredient.objects.filter(recipe__in=recipe_ids).values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    )
+    for recipe_id, ingredient_id, name, measurement_unit, amount in rows:
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def represent_recipes(rows, request):
+    """Список рецептов в том же виде, что и RecipeSerializer(many=True).
+
+    Словари собираются прямо из строк get_recipe_rows() без создания
+    моделей и полей сериализаторов; теги и ингредиенты загружаются двумя
+    запросами, как при prefetch_related. JSON совпадает с сериализатором
+    побайтно, это проверяют тесты api/tests/test_recipe_representation.py.
+    """
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+    if not recipe_ids:
+        return []
+    tags = get_tags(recipe_ids)
+    ingredients = get_ingredients(recipe_ids)
+    subscribed_author_ids = get_subscribed_author_ids(request)
+    media_url = get_media_url(request)
+    return [
+        {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': {
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'email': row['author__email'],
+                'is_subscribed': row['author_id'] in subscribed_author_ids,
+                'avatar': get_file_url(media_url, row['author__avatar']),
+            },
+            'ingredients': ingredients[row['id']],
+            'is_favorited': bool(row['is_favorited']),
+            'is_in_shopping_cart': bool(row['is_in_shopping_cart']),
+            'name': row['name'],
+            'image': get_file_url(media_url, row['image']),
+            'image_variants': {
+                field: get_file_url(media_url, row[field])
+                for field in VARIANTS
+            },
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
@@ -2,24 +2,55 @@ import base64
 import uuid
 
 import six
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db.models import Prefetch
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
-
-from recipes.models import (
-    Favorite,
-    Ingredient,
-    Recipe,
-    RecipeIngredient,
-    ShoppingCart,
-    Tag,
-)
-from users.models import Follow
+
+from jobs.queue import enqueue
+from recipes import shopping_list
+from recipes.images import VARIANTS
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.search import update_search_vectors
 
 User = get_user_model()
 
 
+def get_subscribed_author_ids(request):
+    """Возвращает id авторов, на которых подписан текущий пользователь.
+
+    Множество загружается одним запросом и кешируется на объекте запроса,
+    поэтому вложенные сериализаторы пользователей не обращаются к БД.
+    """
+    if not request or request.user.is_anonymous:
+        return frozenset()
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        author_ids = frozenset(
+            request.user.subscriptions.values_list('author_id', flat=True)
+        )
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
+async def aload_subscribed_author_ids(request):
+    """Загружает подписки для get_subscribed_author_ids() асинхронно.
+
+    Асинхронные обработчики вызывают ее до сериализации, чтобы
+    сериализаторы не обращались к БД из цикла событий.
+    """
+    if request.user.is_anonymous:
+        return
+    if getattr(request, '_subscribed_author_ids', None) is None:
+        request._subscribed_author_ids = frozenset([
+            author_id
+            async for author_id in request.user.subscriptions.values_list(
+                'author_id', flat=True
+            )
+        ])
+
+
 class Base64ImageField(serializers.ImageField):
     """Пользовательское поле для обработки изображений в формате base64."""
 
@@ -46,6 +77,34 @@ class Base64ImageField(serializers.ImageField):
         return extension
 
 
+def enqueue_image_processing(recipe):
+    enqueue(
+        'recipes.process_image',
+        recipe_id=recipe.id,
+        image=recipe.image.name
+    )
+
+
+class ImageVariantsField(serializers.Field):
+    """Ссылки на уменьшенные копии и WebP-версии картинки рецепта."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        variants = {}
+        for field in VARIANTS:
+            image = getattr(recipe, field)
+            url = image.url if image else None
+            if url and request:
+                url = request.build_absolute_uri(url)
+            variants[field] = url
+        return variants
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для модели пользователя."""
 
@@ -60,10 +119,10 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return request.user.subscriptions.filter(author=obj).exists()
+        return obj.id in get_subscribed_author_ids(request)
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -113,10 +172,37 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Сериализатор для минимального отображения рецепта."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+
+def get_recipes_limit(request):
+    """Число рецептов автора в подписках: recipes_limit, но не больше
+    SUBSCRIPTION_RECIPES_MAX_LIMIT (он же используется по умолчанию)."""
+    limit = request.query_params.get('recipes_limit', '') if request else ''
+    if limit.isdigit():
+        return min(int(limit), settings.SUBSCRIPTION_RECIPES_MAX_LIMIT)
+    return settings.SUBSCRIPTION_RECIPES_MAX_LIMIT
+
+
+def get_limited_recipes_prefetch(request):
+    """Prefetch первых рецептов каждого автора одним запросом.
+
+    Срез в Prefetch Django превращает в ROW_NUMBER() OVER
+    (PARTITION BY author_id), поэтому запрос один на всю страницу авторов.
+    """
+    limit = get_recipes_limit(request)
+    return Prefetch(
+        'recipes',
+        queryset=Recipe.objects.only(
+            'id', 'author_id', 'name', 'image', 'image_webp', 'thumbnail',
+            'thumbnail_webp', 'cooking_time'
+        ).order_by('-pub_date', '-id')[:limit],
+        to_attr='limited_recipes'
+    )
 
 
 class SubscriptionSerializer(UserSerializer):
@@ -129,11 +215,10 @@ class SubscriptionSerializer(UserSerializer):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit and limit.isdigit():
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = obj.recipes.all()[:limit]
         return RecipeMinifiedSerializer(recipes, many=True).data
 
 
@@ -211,13 +296,14 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.BooleanField(default=False)
     is_in_shopping_cart = serializers.BooleanField(default=False)
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_variants', 'text', 'cooking_time'
         )
 
 
@@ -263,11 +349,6 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ingredients_set = set()
         for item in value:
             ingredient_id = item['id']
-            if not Ingredient.objects.filter(id=ingredient_id).exists():
-                raise serializers.ValidationError(
-                    f'Ингредиент с id {ingredient_id} не существует'
-                )
-
             if ingredient_id in ingredients_set:
                 raise serializers.ValidationError(
                     'Ингредиенты не должны повторяться'
@@ -279,6 +360,22 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Количество ингредиента должно быть целым числом больше 0'
                 )
+
+        # Все id проверяются одним запросом, а не запросом на ингредиент.
+        missing = ingredients_set - set(
+            Ingredient.objects.filter(
+                id__in=ingredients_set
+            ).values_list('id', flat=True)
+        )
+        if len(missing) == 1:
+            raise serializers.ValidationError(
+                f'Ингредиент с id {missing.pop()} не существует'
+            )
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты с id '
+                f'{", ".join(map(str, sorted(missing)))} не существуют'
+            )
         return value
 
     def validate_tags(self, value):
@@ -313,30 +410,83 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         validated_data['author'] = self.context['request'].user
         recipe = Recipe.objects.create(**validated_data)
 
-        self.update_tags_and_ingredients(recipe, tags_data, ingredients_data)
+        recipe.tags.set(tags_data)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_item['id'],
+                amount=ingredient_item['amount']
+            )
+            for ingredient_item in ingredients_data
+        )
+        update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
+        enqueue_image_processing(recipe)
         return recipe
 
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
 
+        if 'image' in validated_data:
+            enqueue('recipes.delete_files', names=[instance.image.name])
+        text_changed = any(
+            validated_data.get(field, value) != value
+            for field, value in (
+                ('name', instance.name), ('text', instance.text)
+            )
+        )
         instance = super().update(instance, validated_data)
-        self.update_tags_and_ingredients(instance, tags_data, ingredients_data)
+        # set() сам сравнивает теги с текущими и ничего не пишет,
+        # если они не изменились.
+        instance.tags.set(tags_data)
+        names_changed = self.update_ingredients(instance, ingredients_data)
+        if text_changed or names_changed:
+            update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+        if 'image' in validated_data:
+            enqueue_image_processing(instance)
         return instance
 
-    def update_tags_and_ingredients(self, recipe, tags_data, ingredients_data):
-        recipe.tags.set(tags_data)
-        recipe.recipe_ingredients.all().delete()
-
-        recipe_ingredients = [
+    def update_ingredients(self, recipe, ingredients_data):
+        """Применяет к ингредиентам рецепта только разницу с базой.
+
+        Новые строки вставляются, измененные количества обновляются одним
+        bulk_update, лишние строки удаляются. Возвращает True, если
+        изменился состав ингредиентов (от него зависит поисковый вектор).
+        """
+        amounts = {item['id']: item['amount'] for item in ingredients_data}
+        current = {
+            item.ingredient_id: item
+            for item in recipe.recipe_ingredients.all()
+        }
+        to_create = [
             RecipeIngredient(
-                recipe=recipe,
-                ingredient_id=ingredient_item['id'],
-                amount=ingredient_item['amount']
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
             )
-            for ingredient_item in ingredients_data
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
         ]
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        to_update = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                to_update.append(item)
+        to_delete = current.keys() - amounts.keys()
+        if not (to_create or to_update or to_delete):
+            return False
+
+        # Список покупок пересчитывается по старому и новому составу.
+        shopping_list.subtract_recipe(recipe.id)
+        if to_delete:
+            recipe.recipe_ingredients.filter(
+                ingredient_id__in=to_delete
+            ).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        shopping_list.add_recipe(recipe.id)
+        return bool(to_create or to_delete)
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -393,53 +543,11 @@ class RecipeListSerializer(serializers.ModelSerializer):
         return None
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-    """Сериализатор для работы с избранными рецептами."""
-
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен в избранное'
-            )
-        ]
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    """Сериализатор для работы со списком покупок."""
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен в список покупок'
-            )
-        ]
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетного добавления в избранное/корзину."""
 
-
-class FollowSerializer(serializers.ModelSerializer):
-    """Сериализатор для работы с подписками пользователей."""
-
-    class Meta:
-        model = Follow
-        fields = ('user', 'author')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=('user', 'author'),
-                message='Вы уже подписаны на этого автора'
-            )
-        ]
-
-    def validate(self, data):
-        if data['user'] == data['author']:
-            raise serializers.ValidationError(
-                'Нельзя подписаться на самого себя'
-            )
-        return data
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BATCH_MAX_SIZE
+    )
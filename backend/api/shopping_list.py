@@ -0,0 +1,209 @@
+import csv
+import hashlib
+import os
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from api.cache import INGREDIENTS, get_versions
+from recipes.models import ShoppingCart, ShoppingListIngredient
+
+TITLE = 'Список покупок:'
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 20 * mm
+PDF_LINE_HEIGHT = 7 * mm
+CHUNK_SIZE = 64 * 1024
+CACHE_KEY = 'shopping-list:{}:{}'
+
+
+def get_shopping_list_rows(user):
+    """Итератор строк (название, единица измерения, сумма) из БД.
+
+    Суммы берутся из заранее посчитанного списка покупок пользователя,
+    а не агрегируются по рецептам корзины при каждой выгрузке.
+    """
+    return ShoppingListIngredient.objects.filter(user=user).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    ).order_by('ingredient__name').iterator()
+
+
+def render_txt(rows):
+    yield f'{TITLE}\n'.encode('utf-8')
+    for name, measurement_unit, total in rows:
+        yield f'{name} - {total} {measurement_unit}\n'.encode('utf-8')
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER).encode('utf-8-sig')
+    for name, measurement_unit, total in rows:
+        yield writer.writerow((name, total, measurement_unit)).encode('utf-8')
+
+
+def register_pdf_font():
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+        )
+
+
+def render_pdf(rows):
+    """Рисует PDF и отдает его частями.
+
+    reportlab держит все страницы документа в памяти до save(), поэтому
+    документ целиком строится до отправки первого байта, а размер
+    списка ограничен SHOPPING_LIST_PDF_MAX_ROWS (см. is_pdf_too_large).
+    Готовый файл читается из временного файла, который сбрасывается
+    на диск после SHOPPING_LIST_SPOOL_SIZE.
+    """
+    register_pdf_font()
+    with tempfile.SpooledTemporaryFile(
+        max_size=settings.SHOPPING_LIST_SPOOL_SIZE
+    ) as buffer:
+        pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+        width, height = A4
+        pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+        y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, TITLE)
+        for name, measurement_unit, total in rows:
+            y -= PDF_LINE_HEIGHT
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                y = height - PDF_MARGIN
+            pdf.drawString(
+                PDF_MARGIN, y, f'{name} - {total} {measurement_unit}'
+            )
+        pdf.save()
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'pdf': render_pdf,
+}
+
+
+def is_pdf_available():
+    return os.path.exists(settings.SHOPPING_LIST_PDF_FONT)
+
+
+def is_pdf_too_large(user):
+    """Список длиннее SHOPPING_LIST_PDF_MAX_ROWS выгружается только потоком.
+
+    txt и csv формируются построчно, а PDF - целиком в памяти.
+    """
+    return ShoppingListIngredient.objects.filter(user=user)[
+        settings.SHOPPING_LIST_PDF_MAX_ROWS:
+    ].exists()
+
+
+def get_cache_key(user, export_format):
+    """Ключ кеша по содержимому корзины, а не по пользователю.
+
+    Корзина описывается рецептами и временем их изменения, поэтому
+    одинаковые корзины разных пользователей делят одну запись.
+    """
+    cart = ShoppingCart.objects.filter(user=user).order_by(
+        'recipe_id'
+    ).values_list('recipe_id', 'recipe__updated_at')
+    version = get_versions([INGREDIENTS])[INGREDIENTS]
+    digest = hashlib.md5(
+        repr((list(cart), version)).encode('utf-8')
+    ).hexdigest()
+    return CACHE_KEY.format(export_format, digest)
+
+
+def cache_chunks(key, chunks):
+    """Пропускает части файла и кладет его в кеш, если он небольшой."""
+    content = []
+    size = 0
+    for chunk in chunks:
+        if content is not None:
+            size += len(chunk)
+            if size > settings.SHOPPING_LIST_CACHE_MAX_SIZE:
+                content = None
+            else:
+                content.append(chunk)
+        yield chunk
+    if content is not None:
+        cache.set(
+            key, b''.join(content), settings.SHOPPING_LIST_CACHE_TIMEOUT
+        )
+
+
+def read_chunk(chunks):
+    """Склеивает следующие части файла в кусок около CHUNK_SIZE байт."""
+    parts = []
+    size = 0
+    for part in chunks:
+        parts.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            break
+    return b''.join(parts)
+
+
+async def aiterate(chunks):
+    """Асинхронный итератор по частям файла для ASGI.
+
+    Синхронный итератор Django под ASGI сначала собирает в список целиком.
+    Здесь части читаются кусками в потоке запроса, где открыт курсор БД,
+    и уходят клиенту по мере формирования.
+    """
+    get_chunk = sync_to_async(read_chunk, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await get_chunk(chunks)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def shopping_list_response(
+    user, export_format, content_type, asynchronous=False
+):
+    """Отдает список покупок из кеша или формирует его потоком.
+
+    asynchronous - запрос обслуживает ASGI, и поток нужен асинхронный.
+    """
+    key = get_cache_key(user, export_format)
+    content = cache.get(key)
+    if content is not None:
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        chunks = cache_chunks(
+            key, RENDERERS[export_format](get_shopping_list_rows(user))
+        )
+        if asynchronous:
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list.{export_format}"'
+    )
+    return response
@@ -0,0 +1,100 @@
+import string
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from api.cache import aget_versions, get_versions, recipe_dependency
+from recipes.models import Recipe
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+# Идентификаторы рецептов - bigint, большие значения БД не примет.
+MAX_RECIPE_ID = 2 ** 63 - 1
+
+
+def encode(recipe_id):
+    """Кодирует идентификатор рецепта в base62: один рецепт - одна ссылка."""
+    code = ''
+    while True:
+        recipe_id, remainder = divmod(recipe_id, BASE)
+        code = ALPHABET[remainder] + code
+        if not recipe_id:
+            return code
+
+
+def decode(code):
+    """Возвращает идентификатор рецепта или None для чужого кода."""
+    if not code:
+        return None
+    recipe_id = 0
+    for char in code:
+        position = ALPHABET.find(char)
+        if position < 0:
+            return None
+        recipe_id = recipe_id * BASE + position
+        if recipe_id > MAX_RECIPE_ID:
+            return None
+    return recipe_id
+
+
+class ShortLinkResolver:
+    """LRU-кеш процесса для проверки существования рецептов по ссылке.
+
+    Вместе с рецептом хранится версия его зависимости в общем кеше:
+    после изменения или удаления рецепта запись перепроверяется в БД.
+    Несуществующие рецепты не запоминаются, так как созданный позже
+    рецепт с тем же идентификатором версию не меняет.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resolve(self, code):
+        recipe_id = decode(code)
+        if recipe_id is None:
+            return None
+        dependency = recipe_dependency(recipe_id)
+        version = get_versions([dependency])[dependency]
+        if self.is_known(recipe_id, version):
+            return recipe_id
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            return None
+        self.remember(recipe_id, version)
+        return recipe_id
+
+    async def aresolve(self, code):
+        """Асинхронный вариант resolve()."""
+        recipe_id = decode(code)
+        if recipe_id is None:
+            return None
+        dependency = recipe_dependency(recipe_id)
+        version = (await aget_versions([dependency]))[dependency]
+        if self.is_known(recipe_id, version):
+            return recipe_id
+        if not await Recipe.objects.filter(pk=recipe_id).aexists():
+            return None
+        self.remember(recipe_id, version)
+        return recipe_id
+
+    def is_known(self, recipe_id, version):
+        with self._lock:
+            if self._entries.get(recipe_id) == version:
+                self._entries.move_to_end(recipe_id)
+                return True
+        return False
+
+    def remember(self, recipe_id, version):
+        with self._lock:
+            self._entries[recipe_id] = version
+            self._entries.move_to_end(recipe_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+resolver = ShortLinkResolver(settings.SHORT_LINK_CACHE_SIZE)
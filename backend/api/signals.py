@@ -0,0 +1,167 @@
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.cache import (
+    INGREDIENTS,
+    RECIPE_LIST,
+    TAGS,
+    USERS,
+    bump_versions_on_commit,
+    recipe_dependency,
+    token_dependency,
+    user_dependency,
+    user_state_dependency,
+)
+from api.relations import update_counter
+from recipes import shopping_list
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from recipes.search import update_search_vectors
+from users.models import Follow, User
+
+# Счетчики в строках рецептов и пользователей. Эндпоинты API создают и
+# удаляют связи SQL-запросами без сигналов и меняют счетчики сами; здесь
+# обрабатываются изменения через ORM: админка, каскадное удаление
+# пользователя или рецепта.
+RELATION_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_carts_count',
+}
+
+
+def is_deleted_with(origin, model):
+    """Удаление началось с объектов model и их строки тоже удаляются."""
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    # Рецепт виден в списках, поэтому меняется и версия списка: от нее
+    # зависят ETag списка и закешированные страницы, в том числе поиска
+    # по названию, описанию и ингредиентам.
+    bump_versions_on_commit(RECIPE_LIST, recipe_dependency(instance.id))
+    if created:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Рецепт удаляется и каскадом (вместе с автором, из админки), а строки
+    # корзины уходят вместе с ним. Пока они есть, ингредиенты рецепта
+    # вычитаются из списков покупок всех, у кого он в корзине.
+    shopping_list.subtract_recipe(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, origin=None, **kwargs):
+    bump_versions_on_commit(RECIPE_LIST, recipe_dependency(instance.id))
+    if not is_deleted_with(origin, User):
+        update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Recipe):
+        # Смена тегов меняет состав отфильтрованных по тегам списков.
+        bump_versions_on_commit(RECIPE_LIST, recipe_dependency(instance.id))
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    bump_versions_on_commit(
+        RECIPE_LIST, recipe_dependency(instance.recipe_id)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_versions_on_commit(TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_versions_on_commit(INGREDIENTS)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    # Названия ингредиентов входят в поисковые векторы рецептов. Списки
+    # и так зависят от версии ингредиентов, которую сбрасывает
+    # ingredient_changed.
+    update_search_vectors(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    # Смена пароля и деактивация должны сбросить закешированные токены.
+    tokens = Token.objects.filter(user=instance).values_list('key', flat=True)
+    bump_versions_on_commit(
+        USERS,
+        user_dependency(instance.id),
+        *(token_dependency(key) for key in tokens)
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    bump_versions_on_commit(USERS, user_dependency(instance.id))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    bump_versions_on_commit(token_dependency(instance.key))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_relation_saved(sender, instance, created, **kwargs):
+    if created:
+        update_counter(
+            Recipe, instance.recipe_id, RELATION_COUNTERS[sender], 1
+        )
+        bump_versions_on_commit(user_state_dependency(instance.user_id))
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_relation_deleted(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with(origin, Recipe):
+        update_counter(
+            Recipe, instance.recipe_id, RELATION_COUNTERS[sender], -1
+        )
+    bump_versions_on_commit(user_state_dependency(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, 'followers_count', 1)
+        bump_versions_on_commit(user_state_dependency(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, 'followers_count', -1)
+    bump_versions_on_commit(user_state_dependency(instance.user_id))
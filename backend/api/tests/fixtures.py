@@ -0,0 +1,37 @@
+from api.benchmarking import (
+    create_ingredients,
+    create_recipes,
+    create_tags,
+    create_user,
+)
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+AUTHORS_COUNT = 8
+RECIPES_PER_AUTHOR = 3
+INGREDIENTS_PER_RECIPE = 5
+
+
+def create_catalog():
+    """Читатель, подписанный на нескольких авторов с полными страницами.
+
+    Половина рецептов у читателя в избранном, все - в списке покупок.
+    """
+    tags = create_tags(3)
+    ingredients = create_ingredients(INGREDIENTS_PER_RECIPE * 2)
+    reader = create_user('reader')
+    recipes = []
+    for i in range(AUTHORS_COUNT):
+        author = create_user(f'author-{i}')
+        for j in range(RECIPES_PER_AUTHOR):
+            recipes += create_recipes(
+                author, 1, tags, ingredients[j:j + INGREDIENTS_PER_RECIPE]
+            )
+        Follow.objects.create(user=reader, author=author)
+    Favorite.objects.bulk_create(
+        Favorite(user=reader, recipe=recipe) for recipe in recipes[::2]
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=reader, recipe=recipe) for recipe in recipes
+    )
+    return reader, recipes
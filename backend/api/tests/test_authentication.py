@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from api.benchmarking import create_user
+from api.relations import update_counter
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+AVATAR = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+PASSWORD = 'Old-secret-pass-1'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CachedTokenAuthenticationTest(APITestCase):
+    """Пользователь из кеша токенов не перезаписывает счетчики в БД."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = create_user('author', password=PASSWORD)
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        # Токен попадает в кеш, затем счетчики меняются UPDATE-запросом,
+        # как при создании рецепта или подписке.
+        self.client.get('/api/users/me/')
+        update_counter(User, self.user.id, 'recipes_count', 1)
+        update_counter(User, self.user.id, 'followers_count', 2)
+
+    def assertCountersKept(self):
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+        self.assertEqual(self.user.followers_count, 2)
+
+    def test_avatar_change_keeps_counters(self):
+        response = self.client.put(
+            '/api/users/me/avatar/', {'avatar': AVATAR}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountersKept()
+
+        response = self.client.delete('/api/users/me/avatar/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertCountersKept()
+
+    def test_password_change_keeps_counters(self):
+        response = self.client.post(
+            '/api/users/set_password/',
+            {'current_password': PASSWORD, 'new_password': 'New-pass-2024'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertCountersKept()
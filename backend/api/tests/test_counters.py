@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from api.benchmarking import create_recipes, create_user
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+PASSWORD = 'Secret-pass-1'
+
+
+class CountersTest(APITestCase):
+    """Счетчики верны при изменениях через API, ORM и каскадах."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.reader = create_user('reader', password=PASSWORD)
+        self.author = create_user('author')
+        (self.recipe,) = create_recipes(self.author, 1)
+        self.client.force_authenticate(self.reader)
+
+    def assertCounters(self, favorites, carts, followers):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (
+                self.recipe.favorites_count,
+                self.recipe.shopping_carts_count,
+                self.author.followers_count,
+            ),
+            (favorites, carts, followers)
+        )
+
+    def add_relations(self):
+        for url in (
+            f'/api/recipes/{self.recipe.id}/favorite/',
+            f'/api/recipes/{self.recipe.id}/shopping_cart/',
+            f'/api/users/{self.author.id}/subscribe/',
+        ):
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCounters(1, 1, 1)
+
+    def test_api(self):
+        self.add_relations()
+        for url in (
+            f'/api/recipes/{self.recipe.id}/favorite/',
+            f'/api/recipes/{self.recipe.id}/shopping_cart/',
+            f'/api/users/{self.author.id}/subscribe/',
+        ):
+            response = self.client.delete(url)
+            self.assertEqual(
+                response.status_code, status.HTTP_204_NO_CONTENT
+            )
+        self.assertCounters(0, 0, 0)
+
+    def test_batch_api(self):
+        for method in ('post', 'delete'):
+            for url in (
+                '/api/recipes/favorite/', '/api/recipes/shopping_cart/'
+            ):
+                response = getattr(self.client, method)(
+                    url, {'recipes': [self.recipe.id]}, format='json'
+                )
+                self.assertLess(response.status_code, 300)
+            expected = 1 if method == 'post' else 0
+            self.assertCounters(expected, expected, 0)
+
+    def test_reader_deletes_account(self):
+        self.add_relations()
+        response = self.client.delete(
+            f'/api/users/{self.reader.id}/',
+            {'current_password': PASSWORD},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertCounters(0, 0, 0)
+
+    def test_orm(self):
+        # Так связи добавляются и удаляются в админке.
+        relations = [
+            Favorite.objects.create(user=self.reader, recipe=self.recipe),
+            ShoppingCart.objects.create(user=self.reader, recipe=self.recipe),
+            Follow.objects.create(user=self.reader, author=self.author),
+        ]
+        self.assertCounters(1, 1, 1)
+        for relation in relations:
+            relation.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_recipes_count(self):
+        recipe = Recipe.objects.create(
+            author=self.author,
+            name='Рецепт из админки',
+            image='recipes/images/test.png',
+            text='Описание',
+            cooking_time=5
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        recipe.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from api.authentication import token_cache
+from api.tests.fixtures import create_catalog
+from recipes import shopping_list
+
+
+class QueryBudgetTest(APITestCase):
+    """Число SQL-запросов основных эндпоинтов.
+
+    На каждой странице больше одного объекта, поэтому лишний запрос
+    на объект сразу меняет количество. Кеши очищаются перед каждым
+    тестом: первый запрос с токеном читает токен из БД, списки считают
+    количество по статистике и заново. ETag списка рецептов строится
+    из версий в кеше, а для одного рецепта еще один запрос уходит
+    на время его изменения.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.recipes = create_catalog()
+        # Корзины созданы без пересчета, а выгрузке нужен список покупок.
+        shopping_list.rebuild()
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assertQueryCount(self, url, count, client=None):
+        client = client or self.client
+        with self.assertNumQueries(count):
+            response = client.get(url)
+            if response.streaming:
+                # Строки файла читаются из БД, пока отдается поток.
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_recipe_list(self):
+        self.assertQueryCount('/api/recipes/', 7)
+
+    def test_recipe_list_anonymous(self):
+        self.assertQueryCount('/api/recipes/', 5, APIClient())
+
+    def test_recipe_detail(self):
+        self.assertQueryCount(f'/api/recipes/{self.recipes[0].id}/', 6)
+
+    def test_recipe_feed(self):
+        self.assertQueryCount('/api/recipes/feed/', 5)
+
+    def test_user_list(self):
+        self.assertQueryCount('/api/users/', 5)
+
+    def test_subscriptions(self):
+        self.assertQueryCount('/api/users/subscriptions/', 4)
+
+    def test_shopping_cart_download(self):
+        # Токен, ключ кеша по корзине и курсор по строкам списка покупок.
+        response = self.assertQueryCount(
+            '/api/recipes/download_shopping_cart/', 3
+        )
+        self.assertTrue(response.streaming)
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from api.benchmarking import (
+    create_ingredients,
+    create_recipes,
+    create_tags,
+    create_user,
+    make_request,
+)
+from api.cache import (
+    RECIPE_LIST,
+    bump_versions,
+    cached_response,
+    recipe_list_dependencies,
+)
+from recipes.models import Recipe, RecipeIngredient
+
+LIST_URL = '/api/recipes/'
+
+
+class RecipeListCacheTest(APITestCase):
+    """ETag списка и закешированная страница меняются вместе."""
+
+    def setUp(self):
+        cache.clear()
+        self.tags = create_tags(2)
+        self.ingredients = create_ingredients(3)
+        self.author = create_user('author')
+        self.recipes = create_recipes(
+            self.author, 3, self.tags, self.ingredients[:2]
+        )
+
+    def get_list(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(LIST_URL, params, **headers)
+
+    def assertChanged(self, etag, change):
+        """После change() старый ETag не дает 304, а страница - свежая."""
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.get_list(etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_cache_hit_without_queries(self):
+        etag = self.get_list()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_list()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            response = self.get_list(etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_changed(self):
+        etag = self.get_list()['ETag']
+        recipe = self.recipes[0]
+
+        def rename():
+            recipe.name = 'Новое название'
+            recipe.save()
+
+        response = self.assertChanged(etag, rename)
+        self.assertIn(
+            'Новое название',
+            [recipe['name'] for recipe in response.json()['results']]
+        )
+
+    def get_ids(self, response):
+        return {recipe['id'] for recipe in response.json()['results']}
+
+    def test_recipe_added_and_deleted(self):
+        etag = self.get_list()['ETag']
+        recipes = []
+        response = self.assertChanged(
+            etag,
+            lambda: recipes.append(
+                Recipe.objects.create(
+                    author=self.author,
+                    name='Новый рецепт',
+                    image='recipes/images/test.png',
+                    text='Описание',
+                    cooking_time=5
+                )
+            )
+        )
+        self.assertIn(recipes[0].id, self.get_ids(response))
+        response = self.assertChanged(response['ETag'], recipes[0].delete)
+        self.assertNotIn(recipes[0].id, self.get_ids(response))
+
+    def test_recipe_ingredients_changed(self):
+        etag = self.get_list()['ETag']
+        self.assertChanged(
+            etag,
+            lambda: RecipeIngredient.objects.create(
+                recipe=self.recipes[0],
+                ingredient=self.ingredients[2],
+                amount=5
+            )
+        )
+
+    def test_filtered_list(self):
+        params = {'tags': self.tags[0].slug}
+        etag = self.get_list(**params)['ETag']
+        self.assertChanged(
+            etag, lambda: self.recipes[0].tags.remove(self.tags[0])
+        )
+        self.assertNotIn(
+            self.recipes[0].id, self.get_ids(self.get_list(**params))
+        )
+
+    def test_write_while_building_response(self):
+        request = make_request(LIST_URL)
+
+        def get_stale_response():
+            # Изменение фиксируется, пока строится ответ со старыми данными.
+            bump_versions(RECIPE_LIST)
+            return Response({'results': 'stale'})
+
+        for get_response in (get_stale_response, lambda: Response({})):
+            response = cached_response(
+                request, 'recipes', recipe_list_dependencies(), get_response
+            )
+            self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_detail_with_leading_zero(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/0{recipe.id}/'
+        self.assertEqual(self.client.get(url).json()['name'], recipe.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Новое название'
+            recipe.save()
+        self.assertEqual(self.client.get(url).json()['name'], recipe.name)
@@ -0,0 +1,123 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.async_views import get_viewset
+from api.benchmarking import create_user, make_request
+from api.representations import get_recipe_rows, represent_recipes
+from api.views import RecipeViewSet
+from recipes import feed
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Follow
+
+# Имена файлов с пробелами, кириллицей и спецсимволами проверяют
+# экранирование ссылок.
+IMAGE_NAMES = (
+    'recipes/images/parity.png',
+    'recipes/images/борщ со сметаной (1).jpg',
+    'recipes/images/a+b&c=d#e?.png',
+)
+FILTERS = (
+    {},
+    {'tags': 'breakfast'},
+    {'tags': ['breakfast', 'dinner']},
+    {'is_favorited': '1'},
+    {'is_in_shopping_cart': '1'},
+)
+
+
+class RecipeRepresentationTest(TestCase):
+    """represent_recipes() рендерится в тот же JSON, что RecipeSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = Tag.objects.bulk_create([
+            Tag(name='Завтрак', slug='breakfast'),
+            Tag(name='Ужин', slug='dinner'),
+            Tag(name='tag', slug='tag'),
+        ])
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент «{i}»', measurement_unit='г')
+            for i in range(6)
+        )
+        cls.reader = create_user('reader')
+        authors = [
+            create_user(
+                f'author-{i}',
+                first_name='Автор',
+                last_name=f'"{i}"',
+                avatar='avatars/аватар 1.png' if i % 2 else '',
+            )
+            for i in range(3)
+        ]
+        recipes = []
+        for i, image in enumerate(IMAGE_NAMES * 2):
+            recipe = Recipe.objects.create(
+                author=authors[i % len(authors)],
+                name=f'Рецепт <{i}> & "кавычки"',
+                image=image,
+                image_webp='recipes/images/webp/parity.webp' if i % 2 else '',
+                thumbnail=image if i % 3 == 0 else '',
+                text='Строка\nс переводом и \\ слешем\t😀',
+                cooking_time=i + 1,
+            )
+            recipe.tags.set(tags[:i % (len(tags) + 1)])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=i + 1
+                )
+                for ingredient in ingredients[i % 3:i % 3 + i]
+            )
+            recipes.append(recipe)
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors[:2]
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.reader, recipe=recipe)
+            for recipe in recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.reader, recipe=recipe)
+            for recipe in recipes[1:4]
+        )
+
+    def assertSameJSON(self, user, params=None, use_feed=False):
+        request = make_request('/api/recipes/', user, params)
+        view = get_viewset(RecipeViewSet, request, 'list')
+        queryset = view.filter_queryset(view.get_queryset())
+        if use_feed:
+            queryset = feed.get_feed(queryset, user)
+        renderer = JSONRenderer()
+        expected = renderer.render(
+            view.get_serializer(queryset, many=True).data
+        )
+        actual = renderer.render(
+            represent_recipes(get_recipe_rows(queryset), request)
+        )
+        self.assertNotEqual(json.loads(expected), [])
+        # Сначала сравниваются данные, чтобы увидеть отличающееся поле.
+        self.assertEqual(json.loads(actual), json.loads(expected))
+        self.assertEqual(actual, expected)
+
+    def test_list(self):
+        for user in (AnonymousUser(), self.reader):
+            for params in FILTERS:
+                with self.subTest(user=user, params=params):
+                    self.assertSameJSON(user, params)
+
+    def test_feed(self):
+        self.assertSameJSON(self.reader, use_feed=True)
+
+    def test_empty_page(self):
+        self.assertEqual(
+            represent_recipes([], make_request('/api/recipes/')), []
+        )
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.benchmarking import create_ingredients, create_recipes, create_user
+from recipes.models import Recipe
+from recipes.search import update_search_vectors
+
+LIST_URL = '/api/recipes/'
+
+
+class RecipeSearchTest(APITestCase):
+    """Поиск по рецептам для анонимного пользователя с кешем ответов."""
+
+    def setUp(self):
+        cache.clear()
+        (self.ingredient,) = create_ingredients(1)
+        (self.recipe,) = create_recipes(
+            create_user('author'), 1, (), [self.ingredient]
+        )
+        self.rename('борщ')
+
+    def rename(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = name
+            self.recipe.save()
+            update_search_vectors(Recipe.objects.filter(pk=self.recipe.pk))
+
+    def search(self, value):
+        response = self.client.get(LIST_URL, {'search': value})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_cached_search_sees_renamed_recipe(self):
+        self.assertEqual(self.search('борщ'), [self.recipe.id])
+        self.assertEqual(self.search('солянка'), [])
+        self.rename('солянка')
+        self.assertEqual(self.search('борщ'), [])
+        self.assertEqual(self.search('солянка'), [self.recipe.id])
+
+    def test_renamed_ingredient(self):
+        self.assertEqual(self.search('свекла'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.name = 'свекла'
+            self.ingredient.save()
+        self.assertEqual(self.search('свекла'), [self.recipe.id])
+
+    def test_search_with_cursor(self):
+        response = self.client.get(LIST_URL, {'search': 'борщ', 'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('search', response.json())
@@ -0,0 +1,97 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from foodgram.db_routers import (
+    REPLICA_DB_ALIAS,
+    ReplicaRouter,
+    is_replica_configured,
+    read_from_replica,
+)
+from recipes.models import Tag
+
+
+@skipUnless(is_replica_configured(), 'Реплика не настроена (DB_REPLICA_HOST)')
+class ReplicaRoutingTest(TransactionTestCase):
+    """Чтения и записи расходятся по основной БД и реплике.
+
+    В тестах реплика - зеркало тестовой основной БД (TEST MIRROR), поэтому
+    видит ее данные после коммита. TestCase не подходит: внутри транзакции
+    основной БД роутер реплику не выбирает.
+    """
+
+    databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def get(self, url):
+        """Ответ и число запросов к основной БД и к реплике."""
+        with CaptureQueriesContext(
+            connections[DEFAULT_DB_ALIAS]
+        ) as primary, CaptureQueriesContext(
+            connections[REPLICA_DB_ALIAS]
+        ) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(primary), len(replica)
+
+    def sign_up(self):
+        return self.client.post('/api/users/', {
+            'email': 'reader@example.com',
+            'username': 'reader',
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'password': 'Secret-pass-1',
+        })
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Tag))
+        with read_from_replica():
+            self.assertEqual(router.db_for_read(Tag), REPLICA_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Tag), DEFAULT_DB_ALIAS)
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Tag))
+        self.assertIsNone(router.db_for_read(Tag))
+        self.assertFalse(router.allow_migrate(REPLICA_DB_ALIAS, 'recipes'))
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'recipes'))
+
+    def test_replica_actions(self):
+        for url in ('/api/tags/', '/api/users/'):
+            with self.subTest(url=url):
+                _, primary, replica = self.get(url)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_other_actions(self):
+        # Карточка пользователя не входит в replica_actions.
+        user = self.sign_up().json()
+        self.client.cookies.clear()
+        _, primary, replica = self.get(f'/api/users/{user["id"]}/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_sticky_after_write(self):
+        response = self.sign_up()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        # Пока кука жива, клиент читает из основной БД.
+        response, primary, replica = self.get('/api/users/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertIn(
+            'reader', [user['username'] for user in response.json()['results']]
+        )
+        # Кука истекла - чтения снова уходят на реплику.
+        del self.client.cookies[settings.REPLICA_STICKY_COOKIE]
+        _, primary, replica = self.get('/api/users/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
@@ -0,0 +1,226 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from api.authentication import token_cache
+from api.benchmarking import create_ingredients, create_recipes, create_user
+from api.shopping_list import CHUNK_SIZE
+from recipes.models import (
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListIngredient,
+)
+from users.models import User
+
+PASSWORD = 'Secret-pass-1'
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListCascadeTest(APITestCase):
+    """Удаленные каскадом рецепты пропадают из чужих списков покупок."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        ingredients = create_ingredients(2)
+        self.reader = create_user('reader')
+        self.author = create_user('author', password=PASSWORD)
+        self.other_author = create_user('other-author')
+        (self.recipe,) = create_recipes(self.author, 1, (), ingredients)
+        (other_recipe,) = create_recipes(
+            self.other_author, 1, (), ingredients[:1]
+        )
+        self.client.force_authenticate(self.reader)
+        for recipe in (self.recipe, other_recipe):
+            response = self.client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def assertShoppingList(self, expected):
+        self.assertEqual(
+            dict(
+                ShoppingListIngredient.objects.filter(
+                    user=self.reader
+                ).values_list('ingredient__name', 'amount')
+            ),
+            expected
+        )
+        response = self.client.get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.getvalue().decode(),
+            'Список покупок:\n' + ''.join(
+                f'{name} - {amount} г\n'
+                for name, amount in sorted(expected.items())
+            )
+        )
+
+    def test_author_deletes_account(self):
+        self.assertShoppingList({'ingredient-0': 2, 'ingredient-1': 1})
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.delete(
+            f'/api/users/{self.author.id}/',
+            {'current_password': PASSWORD},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertShoppingList({'ingredient-0': 1})
+
+    def test_recipe_deleted_outside_api(self):
+        # Так рецепт удаляется из админки.
+        Recipe.objects.get(pk=self.recipe.id).delete()
+        self.assertShoppingList({'ingredient-0': 1})
+
+    def test_author_deletes_recipe(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.client.force_authenticate(self.reader)
+        self.assertShoppingList({'ingredient-0': 1})
+
+
+class ShoppingListAdminTest(TestCase):
+    """Правки корзин и ингредиентов рецептов в админке меняют списки."""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(
+            User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        )
+        self.reader = create_user('reader')
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.reader)
+        self.ingredients = create_ingredients(2)
+        (self.recipe,) = create_recipes(
+            create_user('author'), 1, (), self.ingredients
+        )
+
+    def assertDownload(self, expected):
+        response = self.api_client.get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.getvalue().decode(),
+            'Список покупок:\n' + ''.join(
+                f'{name} - {amount} г\n'
+                for name, amount in sorted(expected.items())
+            )
+        )
+
+    def test_shopping_cart(self):
+        response = self.client.post(
+            '/admin/recipes/shoppingcart/add/',
+            {'user': self.reader.id, 'recipe': self.recipe.id}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertDownload({'ingredient-0': 1, 'ingredient-1': 1})
+        cart = ShoppingCart.objects.get(user=self.reader)
+        response = self.client.post(
+            f'/admin/recipes/shoppingcart/{cart.id}/delete/', {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertDownload({})
+
+    def test_recipe_ingredients(self):
+        response = self.api_client.post(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertDownload({'ingredient-0': 1, 'ingredient-1': 1})
+        first, second = RecipeIngredient.objects.order_by('ingredient__name')
+        response = self.client.post(
+            f'/admin/recipes/recipeingredient/{first.id}/change/',
+            {
+                'recipe': self.recipe.id,
+                'ingredient': first.ingredient_id,
+                'amount': 5,
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertDownload({'ingredient-0': 5, 'ingredient-1': 1})
+        response = self.client.post(
+            '/admin/recipes/recipeingredient/',
+            {
+                'action': 'delete_selected',
+                '_selected_action': [second.id],
+                'post': 'yes',
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertDownload({'ingredient-0': 5})
+
+
+@override_settings(SHOPPING_LIST_PDF_MAX_ROWS=2)
+class ShoppingListPDFTest(APITestCase):
+    """PDF строится в памяти, поэтому длинные списки в нем не выгружаются."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('reader')
+        self.client.force_authenticate(self.user)
+        self.ingredients = create_ingredients(3)
+
+    def download(self, rows):
+        ShoppingListIngredient.objects.bulk_create(
+            ShoppingListIngredient(
+                user=self.user, ingredient=ingredient, amount=1
+            )
+            for ingredient in self.ingredients[:rows]
+        )
+        return self.client.get(DOWNLOAD_URL, {'format': 'pdf'})
+
+    def test_within_limit(self):
+        response = self.download(2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(b''.join(response.streaming_content).startswith(
+            b'%PDF'
+        ))
+
+    def test_over_limit(self):
+        response = self.download(3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('errors', json.loads(response.content))
+
+
+class ShoppingListStreamingTest(TestCase):
+    """Под ASGI список покупок отдается асинхронным потоком по частям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+        # Строк хватает на несколько кусков по CHUNK_SIZE.
+        ShoppingListIngredient.objects.bulk_create(
+            ShoppingListIngredient(
+                user=cls.user, ingredient=ingredient, amount=1
+            )
+            for ingredient in create_ingredients(CHUNK_SIZE // 8)
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+
+    async def test_asgi_download(self):
+        response = await self.async_client.get(
+            DOWNLOAD_URL, headers={'Authorization': f'Token {self.token.key}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        expected = await sync_to_async(
+            lambda: client.get(DOWNLOAD_URL).getvalue()
+        )()
+        self.assertEqual(b''.join(chunks), expected)
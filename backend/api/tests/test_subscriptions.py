@@ -0,0 +1,46 @@
+from django.db import IntegrityError
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.benchmarking import create_user
+from users.models import Follow
+
+
+class SubscribeTest(APITestCase):
+    """Подписаться на самого себя нельзя ни через API, ни в обход него."""
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        self.client.force_authenticate(self.user)
+
+    def test_subscribe_to_self(self):
+        for id in (self.user.id, f'0{self.user.id}', f'00{self.user.id}'):
+            with self.subTest(id=id):
+                response = self.client.post(f'/api/users/{id}/subscribe/')
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_subscribe_with_leading_zero(self):
+        response = self.client.post(f'/api/users/0{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['id'], self.author.id)
+        response = self.client.delete(
+            f'/api/users/0{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_invalid_id(self):
+        for method in (self.client.post, self.client.delete):
+            with self.subTest(method=method.__name__):
+                response = method('/api/users/abc/subscribe/')
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+    def test_self_follow_constraint(self):
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=self.user)
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from api.benchmarking import create_user
+
+
+class UserDetailETagTest(APITestCase):
+    """ETag профиля меняется при изменении пользователя."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = create_user('author')
+        self.client.force_authenticate(create_user('reader'))
+
+    def test_profile_changed(self):
+        for url in (
+            f'/api/users/{self.user.id}/', f'/api/users/0{self.user.id}/'
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.user.first_name = f'Имя {url}'
+                    self.user.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    response.data['first_name'], self.user.first_name
+                )
+
+    def test_invalid_id(self):
+        response = self.client.get('/api/users/abc/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
 from api.views import (
     CustomUserViewSet,
     IngredientViewSet,
@@ -17,6 +18,14 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('users', CustomUserViewSet, basename='users')
 
 urlpatterns = [
+    # GET и HEAD к спискам и карточкам обрабатываются асинхронно,
+    # остальные методы передаются тем же вьюсетам.
+    path('tags/', async_views.tag_list),
+    path('tags/<int:pk>/', async_views.tag_detail),
+    path('ingredients/', async_views.ingredient_list),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail),
+    path('recipes/', async_views.recipe_list),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,36 +1,80 @@
 import base64
-from io import BytesIO
+from functools import partial
 
-import shortuuid
 from django.core.files.base import ContentFile
-from django.db.models import Count, Exists, OuterRef, Sum, Value
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Value
+from django.db.models.functions import Greatest
+from django.http import Http404
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-
+from rest_framework.settings import api_settings
+
+from api import short_links
+from api.cache import (
+    INGREDIENTS,
+    TAGS,
+    bump_versions_on_commit,
+    cached_response,
+    conditional_response,
+    is_cacheable,
+    make_etag,
+    recipe_dependency,
+    recipe_detail_dependencies,
+    recipe_list_dependencies,
+    user_dependency,
+    user_state_dependency,
+)
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CustomPagination
+from api.ingredient_index import get_ingredient_index, search_ingredients
+from api.pagination import (
+    CustomPagination,
+    FeedCursorPagination,
+    RecipeCursorPagination,
+    invalidate_count_cache,
+)
 from api.permissions import IsAuthorOrReadOnly
+from api.relations import (
+    create_relation,
+    create_relations,
+    delete_relation,
+    delete_relations,
+    increment_counter,
+    update_counter,
+)
+from api.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from api.representations import get_recipe_rows, represent_recipes
 from api.serializers import (
-    FavoriteSerializer,
-    FollowSerializer,
     IngredientSerializer,
     RecipeCreateSerializer,
+    RecipeIdsSerializer,
     RecipeMinifiedSerializer,
     RecipeSerializer,
-    ShoppingCartSerializer,
     SubscribeSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UserAvatarSerializer,
     UserSerializer,
+    get_limited_recipes_prefetch,
+)
+from api.shopping_list import (
+    RENDERERS,
+    is_pdf_available,
+    is_pdf_too_large,
+    shopping_list_response,
 )
+from jobs.queue import enqueue
+from recipes import feed, shopping_list
+from recipes.images import get_image_files
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -52,44 +96,48 @@ def decode_base64_image(base64_string):
     )
 
 
-def create_shopping_list_file(ingredients):
-    """Создает файл со списком покупок и возвращает буфер BytesIO."""
-    shopping_list = "Список покупок:\n"
-    for ingredient in ingredients:
-        shopping_list += (
-            f"{ingredient['ingredient__name']} - "
-            f"{ingredient['total']} "
-            f"{ingredient['ingredient__measurement_unit']}\n"
-        )
-    buffer = BytesIO()
-    buffer.write(shopping_list.encode('utf-8'))
-    buffer.seek(0)
-    return buffer
+def handle_recipe_relation(request, pk, model_class, counter_field):
+    """Обрабатывает добавление/удаление рецепта в избранное или корзину.
 
-
-def handle_recipe_relation(request, pk, model_class, serializer_class):
-    """Обрабатывает добавление/удаление рецепта в избранное или корзину."""
+    Добавление - это INSERT ... ON CONFLICT DO NOTHING и UPDATE счетчика
+    с RETURNING, который заодно возвращает рецепт для ответа. Связи
+    создаются и удаляются без сигналов, поэтому счетчик меняется здесь,
+    а не в api/signals.py.
+    """
+    if not pk.isdigit():
+        raise Http404
     if request.method == 'POST':
-        recipe = get_object_or_404(Recipe, id=pk)
-        if model_class.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).exists():
+        with transaction.atomic():
+            created = create_relation(
+                model_class, request.user.id, 'recipe', int(pk)
+            )
+            if created:
+                recipe = increment_counter(Recipe, pk, counter_field)
+                if model_class is ShoppingCart:
+                    shopping_list.add_recipe(recipe.id, request.user.id)
+                bump_versions_on_commit(
+                    user_state_dependency(request.user.id)
+                )
+        if not created:
+            if not Recipe.objects.filter(pk=pk).exists():
+                raise Http404
             return Response(
                 {'errors': 'Объект уже существует'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        data = {'user': request.user.id, 'recipe': recipe.id}
-        serializer = serializer_class(data=data)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
         recipe_serializer = RecipeMinifiedSerializer(recipe)
         return Response(recipe_serializer.data, status=status.HTTP_201_CREATED)
 
-    deleted, _ = model_class.objects.filter(
-        user=request.user, recipe_id=pk
-    ).delete()
+    with transaction.atomic():
+        if model_class is ShoppingCart:
+            # Пока рецепт в корзине, по нему видно, что вычитать.
+            shopping_list.subtract_recipe(pk, request.user.id)
+        deleted = delete_relation(
+            model_class, request.user.id, 'recipe', int(pk)
+        )
+        if deleted:
+            update_counter(Recipe, pk, counter_field, -1)
+            bump_versions_on_commit(user_state_dependency(request.user.id))
     if deleted:
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response(
@@ -98,6 +146,60 @@ def handle_recipe_relation(request, pk, model_class, serializer_class):
     )
 
 
+def handle_recipe_relations_batch(request, model_class, counter_field):
+    """Добавляет или удаляет пачку рецептов в избранном или корзине.
+
+    Все изменения выполняются в одной транзакции фиксированным числом
+    запросов, в ответе для каждого id указан результат.
+    """
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+    user = request.user
+    adding = request.method == 'POST'
+    with transaction.atomic():
+        if adding:
+            changed = create_relations(
+                model_class, user.id, 'recipe', recipe_ids
+            )
+            if changed and model_class is ShoppingCart:
+                shopping_list.add_recipes(changed, user.id)
+        else:
+            changed = set(
+                model_class.objects.select_for_update().filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list('recipe_id', flat=True)
+            )
+            if changed and model_class is ShoppingCart:
+                shopping_list.subtract_recipes(changed, user.id)
+            delete_relations(model_class, user.id, 'recipe', changed)
+        if changed:
+            Recipe.objects.filter(pk__in=changed).update(**{
+                counter_field: Greatest(
+                    F(counter_field) + (1 if adding else -1), 0
+                )
+            })
+            bump_versions_on_commit(user_state_dependency(user.id))
+
+    existing = set()
+    if adding and len(changed) < len(recipe_ids):
+        existing = set(
+            Recipe.objects.filter(
+                pk__in=set(recipe_ids) - changed
+            ).values_list('id', flat=True)
+        )
+    results = []
+    for recipe_id in recipe_ids:
+        if recipe_id in changed:
+            result = 'created' if adding else 'deleted'
+        elif recipe_id in existing:
+            result = 'already_exists'
+        else:
+            result = 'not_found'
+        results.append({'id': recipe_id, 'status': result})
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с тегами."""
 
@@ -105,6 +207,23 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = [AllowAny]
+    # GET-запросы к этим действиям читают с реплики, если она настроена
+    # (foodgram.middleware.ReplicaMiddleware).
+    replica_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            make_etag(request, TAGS),
+            partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            make_etag(request, TAGS),
+            partial(super().retrieve, request, *args, **kwargs)
+        )
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -116,6 +235,27 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
     permission_classes = [AllowAny]
+    replica_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            make_etag(request, INGREDIENTS),
+            partial(self.search, request)
+        )
+
+    def search(self, request):
+        """Ищет ингредиенты по началу названия в индексе процесса."""
+        return Response(
+            search_ingredients(get_ingredient_index(), request.query_params)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            make_etag(request, INGREDIENTS),
+            partial(super().retrieve, request, *args, **kwargs)
+        )
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -126,6 +266,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    replica_actions = (
+        'list', 'retrieve', 'get_link', 'feed', 'download_shopping_cart'
+    )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            cursor_param = RecipeCursorPagination.cursor_query_param
+            if self.action == 'feed':
+                self._paginator = FeedCursorPagination()
+            elif cursor_param in self.request.query_params:
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_serializer_class(self):
         if self.action in ['create', 'partial_update', 'update']:
@@ -135,7 +290,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         queryset = Recipe.objects.select_related(
-            'author').prefetch_related('tags', 'ingredients')
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
 
         if user.is_authenticated:
             return queryset.annotate(
@@ -158,10 +320,82 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            recipe = serializer.save(author=self.request.user)
+            feed.publish(recipe.id)
+            transaction.on_commit(lambda: invalidate_count_cache(Recipe))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            enqueue(
+                'recipes.delete_files', names=get_image_files(instance)
+            )
+            instance.delete()
+            transaction.on_commit(lambda: invalidate_count_cache(Recipe))
 
     def perform_update(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
+
+    def get_list_etag(self):
+        # Те же версии, от которых зависит закешированная страница: любое
+        # изменение рецепта, тегов, ингредиентов или авторов меняет ETag
+        # без запроса к БД.
+        return make_etag(self.request, *recipe_list_dependencies())
+
+    def get_detail_etag(self):
+        pk = self.kwargs['pk']
+        if not pk.isdigit():
+            return None
+        recipe = Recipe.objects.filter(pk=pk).values_list(
+            'updated_at', 'author_id'
+        ).first()
+        if recipe is None:
+            return None
+        updated_at, author_id = recipe
+        return make_etag(
+            self.request,
+            TAGS, INGREDIENTS,
+            recipe_dependency(int(pk)),
+            user_dependency(author_id),
+            extra=(updated_at,)
+        )
+
+    def get_page_response(self, queryset):
+        """Страница рецептов, собранная без сериализаторов DRF."""
+        page = self.paginate_queryset(get_recipe_rows(queryset))
+        return self.get_paginated_response(
+            represent_recipes(page, self.request)
+        )
+
+    def list(self, request, *args, **kwargs):
+        def get_response():
+            return self.get_page_response(
+                self.filter_queryset(self.get_queryset())
+            )
+
+        if is_cacheable(request):
+            get_response = partial(
+                cached_response,
+                request, 'recipes', recipe_list_dependencies(), get_response
+            )
+        return conditional_response(
+            request, self.get_list_etag(), get_response
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        pk = kwargs['pk']
+        if is_cacheable(request) and pk.isdigit():
+            get_response = partial(
+                cached_response,
+                request, 'recipe', recipe_detail_dependencies(int(pk)),
+                get_response
+            )
+        etag = self.get_detail_etag()
+        if etag is None:
+            return get_response()
+        return conditional_response(request, etag, get_response)
 
     @action(
         detail=True,
@@ -170,8 +404,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[AllowAny]
     )
     def get_link(self, request, pk=None):
-        short_uuid = shortuuid.uuid()[:8]
-        short_link = f"http://{request.get_host()}/r/{short_uuid}"
+        if not pk.isdigit():
+            raise Http404
+        code = short_links.encode(int(pk))
+        if short_links.resolver.resolve(code) is None:
+            raise Http404
+        short_link = request.build_absolute_uri(
+            reverse('short-link', args=[code])
+        )
 
         return Response(
             {'short-link': short_link},
@@ -185,7 +425,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         return handle_recipe_relation(
-            request, pk, Favorite, FavoriteSerializer
+            request, pk, Favorite, 'favorites_count'
         )
 
     @action(
@@ -195,27 +435,71 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         return handle_recipe_relation(
-            request, pk, ShoppingCart, ShoppingCartSerializer
+            request, pk, ShoppingCart, 'shopping_carts_count'
         )
 
     @action(
         detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-batch',
         permission_classes=[IsAuthenticated]
     )
+    def favorite_batch(self, request):
+        return handle_recipe_relations_batch(
+            request, Favorite, 'favorites_count'
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return handle_recipe_relations_batch(
+            request, ShoppingCart, 'shopping_carts_count'
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        return self.get_page_response(
+            feed.get_feed(self.get_queryset(), request.user)
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            PlainTextRenderer, CSVRenderer, PDFRenderer, JSONRenderer
+        ]
+    )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shoppingcarts__user=user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(total=Sum('amount'))
-
-        shopping_list_file = create_shopping_list_file(ingredients)
-        response = HttpResponse(shopping_list_file, content_type='text/plain')
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+        renderer = request.accepted_renderer
+        if renderer.format not in RENDERERS:
+            renderer = PlainTextRenderer()
+        if renderer.format == 'pdf' and not is_pdf_available():
+            return Response(
+                {'errors': 'Выгрузка в PDF недоступна'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if renderer.format == 'pdf' and is_pdf_too_large(request.user):
+            return Response(
+                {'errors': 'Список покупок слишком большой для PDF, '
+                           'выгрузите его в txt или csv'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        return shopping_list_response(
+            request.user, renderer.format, content_type,
+            asynchronous=isinstance(request._request, ASGIRequest)
         )
-        return response
 
 
 class CustomUserViewSet(UserViewSet):
@@ -224,9 +508,18 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = UserSerializer
     pagination_class = CustomPagination
     parser_classes = (JSONParser, MultiPartParser, FormParser)
+    replica_actions = ('list',)
 
     def get_queryset(self):
-        return User.objects.annotate(recipes_count=Count('recipes'))
+        return User.objects.all()
+
+    def perform_create(self, serializer, *args, **kwargs):
+        super().perform_create(serializer, *args, **kwargs)
+        transaction.on_commit(lambda: invalidate_count_cache(User))
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        transaction.on_commit(lambda: invalidate_count_cache(User, Recipe))
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -243,11 +536,30 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        serializer = UserSerializer(
-            request.user,
-            context={'request': request}
+        def get_response():
+            serializer = UserSerializer(
+                request.user,
+                context={'request': request}
+            )
+            return Response(serializer.data)
+
+        return conditional_response(
+            request,
+            make_etag(request, user_dependency(request.user.id)),
+            get_response
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        if not kwargs['id'].isdigit():
+            return get_response()
+        # Версия сбрасывается по числовому id: /users/07/ - тот же
+        # пользователь, что и /users/7/.
+        return conditional_response(
+            request,
+            make_etag(request, user_dependency(int(kwargs['id']))),
+            get_response
         )
-        return Response(serializer.data)
 
     @action(
         detail=False,
@@ -297,12 +609,31 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscribe(self, request, id=None):
         user = request.user
+        if not id.isdigit():
+            raise Http404
+        # Сравнивается число: id вида 007 указывает на того же пользователя.
+        id = int(id)
         if request.method == 'POST':
-            author = get_object_or_404(User, id=id)
-            data = {'user': user.id, 'author': author.id}
-            serializer = FollowSerializer(data=data)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            if id == user.id:
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Нельзя подписаться на самого себя'
+                    ]
+                })
+            with transaction.atomic():
+                created = create_relation(Follow, user.id, 'author', id)
+                if created:
+                    author = increment_counter(User, id, 'followers_count')
+                    feed.follow(user.id, author.id)
+                    bump_versions_on_commit(user_state_dependency(user.id))
+            if not created:
+                if not User.objects.filter(pk=id).exists():
+                    raise Http404
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Вы уже подписаны на этого автора'
+                    ]
+                })
 
             subscription_serializer = SubscribeSerializer(
                 author,
@@ -313,7 +644,12 @@ class CustomUserViewSet(UserViewSet):
                 status=status.HTTP_201_CREATED
             )
 
-        deleted, _ = Follow.objects.filter(user=user, author_id=id).delete()
+        with transaction.atomic():
+            deleted = delete_relation(Follow, user.id, 'author', id)
+            if deleted:
+                update_counter(User, id, 'followers_count', -1)
+                feed.unfollow(user.id, id)
+                bump_versions_on_commit(user_state_dependency(user.id))
         if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
@@ -328,7 +664,8 @@ class CustomUserViewSet(UserViewSet):
     def subscriptions(self, request):
         user = request.user
         queryset = User.objects.filter(following__user=user).annotate(
-            recipes_count=Count('recipes'))
+            is_subscribed=Value(True)
+        ).prefetch_related(get_limited_recipes_prefetch(request))
         pages = self.paginate_queryset(queryset)
         serializer = SubscriptionSerializer(
             pages,
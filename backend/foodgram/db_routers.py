@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def is_replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    """Отправляет чтения внутри блока на реплику, если она настроена."""
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Роутер, читающий с реплики только внутри read_from_replica().
+
+    Все записи, миграции и чтения вне этого блока идут в основную БД.
+    Внутри транзакции основной БД реплика не используется, чтобы
+    не прочитать старые данные в одной транзакции с записью.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _read_from_replica.get()
+            and is_replica_configured()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На реплике те же данные, что и в основной БД.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
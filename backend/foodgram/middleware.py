@@ -0,0 +1,73 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from foodgram.db_routers import is_replica_configured, read_from_replica
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ReplicaMiddleware:
+    """Направляет безопасные запросы к отдельным действиям API на реплику.
+
+    Вьюсет перечисляет такие действия в replica_actions. После любого
+    изменяющего запроса клиент получает короткоживущую куку, и пока она
+    есть, его запросы читают из основной БД и видят свои изменения,
+    несмотря на отставание реплики. Работает и под WSGI, и под ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not is_replica_configured():
+            return self.get_response(request)
+        if self.can_use_replica(request):
+            with read_from_replica():
+                return self.get_response(request)
+        return self.stick_to_primary(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if not is_replica_configured():
+            return await self.get_response(request)
+        if self.can_use_replica(request):
+            with read_from_replica():
+                return await self.get_response(request)
+        return self.stick_to_primary(
+            request, await self.get_response(request)
+        )
+
+    def stick_to_primary(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def can_use_replica(self, request):
+        if (
+            request.method not in SAFE_METHODS
+            or settings.REPLICA_STICKY_COOKIE in request.COOKIES
+        ):
+            return False
+        try:
+            view_func = resolve(request.path_info).func
+        except Resolver404:
+            return False
+        actions = getattr(view_func, 'actions', None) or {}
+        view_class = getattr(view_func, 'cls', None)
+        return actions.get('get') in getattr(
+            view_class, 'replica_actions', ()
+        )
@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'admin_auto_filters',
 ]
 
@@ -43,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -77,6 +80,41 @@ DATABASES = {
     }
 }
 
+# Необязательная реплика для чтения (foodgram.db_routers)
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_routers.ReplicaRouter']
+# После изменяющего запроса клиент столько секунд читает из основной БД
+REPLICA_STICKY_COOKIE = 'read_primary'
+REPLICA_STICKY_SECONDS = 10
+
+
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+# Кеш в памяти процесса не виден другим процессам: версии ответов,
+# токенов и индекса ингредиентов сбрасываются только в том процессе,
+# где произошло изменение. Он годится для разработки и одного воркера,
+# в docker-compose используется memcached (см. gunicorn.conf.py).
+CACHE_IS_LOCAL = CACHE_BACKEND.endswith('LocMemCache')
+
+if CACHE_IS_LOCAL:
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -125,7 +163,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -154,11 +192,62 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760
 
 # Настройки для работы с изображениями
 ALLOWED_IMAGE_FORMATS = ['jpg', 'jpeg', 'png']
+# Картинки рецептов ужимаются при загрузке, для списков есть миниатюры
+RECIPE_IMAGE_MAX_SIZE = (1280, 1280)
+RECIPE_IMAGE_THUMBNAIL_SIZE = (480, 480)
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_IMAGE_WEBP_QUALITY = 80
 
 # Константы
 PAGE_SIZE = 6
 PAGE_SIZE_QUERY_PARAM = 'limit'
 MAX_PAGE_SIZE = 100
+# Максимум рецептов в одном пакетном запросе к избранному и корзине
+RECIPE_BATCH_MAX_SIZE = 100
+# Максимум рецептов автора в ответе подписок (recipes_limit)
+SUBSCRIPTION_RECIPES_MAX_LIMIT = 20
+# Таблицы крупнее этого порога считаются по статистике планировщика
+PAGINATION_ESTIMATE_THRESHOLD = 100000
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+# Время жизни закешированных ответов API для анонимных пользователей
+RESPONSE_CACHE_TIMEOUT = 300
+# Время жизни версий, от которых зависят кеши и ETag. Истекшая версия
+# создается заново, и зависящие от нее записи просто считаются устаревшими.
+CACHE_VERSION_TIMEOUT = 24 * 60 * 60
+
+# Выгрузка списка покупок
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+SHOPPING_LIST_SPOOL_SIZE = 1024 * 1024
+# PDF строится в памяти целиком, поэтому число строк в нем ограничено
+SHOPPING_LIST_PDF_MAX_ROWS = 1000
+SHOPPING_LIST_CACHE_MAX_SIZE = 1024 * 1024
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+# Фоновые задачи (python manage.py run_jobs)
+# При JOBS_EAGER задачи выполняются в том же процессе сразу после коммита
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'false').lower() == 'true'
+JOBS_POLL_INTERVAL = 1
+JOBS_TIMEOUT = 10 * 60
+JOBS_RETRY_DELAY = 10
+JOBS_MAX_RETRY_DELAY = 60 * 60
+JOBS_KEEP_DONE_DAYS = 7
+
+# Лента подписок (/api/recipes/feed/). При FEED_TIMELINE новые рецепты
+# раскладываются по лентам подписчиков, и пользователи, подписанные
+# хотя бы на FEED_TIMELINE_MIN_FOLLOWING авторов, читают ленту из нее.
+# После включения ленты нужно выполнить python manage.py rebuild_feed
+FEED_TIMELINE = os.getenv('FEED_TIMELINE', 'false').lower() == 'true'
+FEED_TIMELINE_MIN_FOLLOWING = 50
+
+# Кеш проверки токенов авторизации в памяти процесса
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
+
+# Короткие ссылки на рецепты
+SHORT_LINK_CACHE_SIZE = 10000
 EMAIL_MAX_LENGTH = 254
 FIRST_NAME_MAX_LENGTH = 150
 LAST_NAME_MAX_LENGTH = 150
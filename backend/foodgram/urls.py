@@ -3,9 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.async_views import short_link_redirect
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('r/<str:code>', short_link_redirect, name='short-link'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,18 @@
+import os
+
+from foodgram.settings import CACHE_IS_LOCAL
+
+# Приложение запускается как ASGI: асинхронные представления чтения
+# обслуживают много одновременных запросов в цикле событий процесса.
+bind = '0.0.0.0:8000'
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+
+# Версии закешированных ответов и токенов должны быть общими для всех
+# воркеров, иначе изменение видно только в одном из них.
+if workers > 1 and CACHE_IS_LOCAL:
+    raise RuntimeError(
+        f'GUNICORN_WORKERS={workers} requires a shared cache: set '
+        'CACHE_BACKEND and CACHE_LOCATION (e.g. memcached) or run '
+        'a single worker'
+    )
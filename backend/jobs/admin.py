@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('locked_at', 'last_error', 'created_at')
+    actions = ('retry',)
+
+    @admin.action(description='Перезапустить выбранные задачи')
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Job.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_at=None
+        )
@@ -0,0 +1,61 @@
+import signal
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import claim, delete_finished, run_job
+
+CLEANUP_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for jobs'
+        )
+
+    def handle(self, *args, **options):
+        if settings.CACHE_IS_LOCAL:
+            # Рецепты, измененные задачами, остались бы в кеше веб-процессов.
+            self.stderr.write(self.style.WARNING(
+                'CACHE_BACKEND is process-local: cached responses will not '
+                'see changes made by jobs. Use a shared cache.'
+            ))
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        done = failed = 0
+        cleaned_at = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - cleaned_at > CLEANUP_INTERVAL:
+                delete_finished(timedelta(days=settings.JOBS_KEEP_DONE_DAYS))
+                cleaned_at = time.monotonic()
+            job = claim()
+            if job is None:
+                if options['burst']:
+                    break
+                time.sleep(settings.JOBS_POLL_INTERVAL)
+                continue
+            if run_job(job):
+                done += 1
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'Job {job} failed'))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully processed {done} jobs ({failed} failed)'
+            )
+        )
+
+    def stop(self, signum, frame):
+        """Дорабатывает текущую задачу и завершает цикл."""
+        self.stopping = True
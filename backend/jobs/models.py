@@ -0,0 +1,72 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди, которую выполняет run_jobs."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Задача'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Параметры'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить не раньше'
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='job_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
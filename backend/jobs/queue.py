@@ -0,0 +1,112 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name):
+    """Регистрирует функцию как фоновую задачу с именем name."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def enqueue(name, max_attempts=None, **payload):
+    """Ставит задачу в очередь.
+
+    Строка очереди пишется в текущей транзакции, поэтому воркер увидит
+    задачу только после коммита, а при откате она исчезнет вместе с ним.
+    """
+    if name not in _tasks:
+        raise KeyError(f'Неизвестная задача {name}')
+    job = Job(name=name, payload=payload)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    if settings.JOBS_EAGER:
+        # Задача сразу считается взятой: выполнит ее этот же процесс.
+        job.status = Job.RUNNING
+        job.attempts = 1
+        job.locked_at = timezone.now()
+    job.save()
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(job))
+    return job
+
+
+def get_retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором: 2, 4, 8... базовых."""
+    return timedelta(
+        seconds=min(
+            settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+            settings.JOBS_MAX_RETRY_DELAY
+        )
+    )
+
+
+def claim():
+    """Забирает одну готовую к запуску задачу или возвращает None.
+
+    На PostgreSQL строки блокируются с SKIP LOCKED, так что несколько
+    воркеров не мешают друг другу. Задачи, зависшие в статусе running
+    дольше JOBS_TIMEOUT (например, после падения воркера), берутся снова.
+    """
+    now = timezone.now()
+    queryset = Job.objects.filter(
+        Q(status=Job.PENDING, run_at__lte=now)
+        | Q(
+            status=Job.RUNNING,
+            locked_at__lt=now - timedelta(seconds=settings.JOBS_TIMEOUT)
+        )
+    ).order_by('run_at', 'id')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        job = queryset.first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_at'])
+    return job
+
+
+def run_job(job):
+    """Выполняет задачу и записывает результат или планирует повтор."""
+    try:
+        _tasks[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + get_retry_delay(job.attempts)
+        else:
+            job.status = Job.FAILED
+        logger.exception('Job %s failed', job)
+    else:
+        job.status = Job.DONE
+        job.last_error = ''
+    job.locked_at = None
+    job.save(
+        update_fields=['status', 'run_at', 'locked_at', 'last_error']
+    )
+    return job.status == Job.DONE
+
+
+def delete_finished(older_than):
+    """Удаляет выполненные задачи старше older_than."""
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, run_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
@@ -1,6 +1,12 @@
+from contextlib import contextmanager
+
 from admin_auto_filters.filters import AutocompleteFilter
 from django.contrib import admin
+from django.utils import timezone
+
+from jobs.queue import enqueue
 
+from . import feed, shopping_list
 from .models import (
     Favorite,
     Ingredient,
@@ -9,6 +15,7 @@ from .models import (
     ShoppingCart,
     Tag,
 )
+from .search import update_search_vectors
 
 
 @admin.register(Tag)
@@ -64,13 +71,25 @@ class RecipeAdmin(admin.ModelAdmin):
         queryset = super().get_queryset(request)
         return queryset.select_related('author').prefetch_related(
             'tags',
-            'ingredients',
-            'favorites'
+            'ingredients'
         )
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-    favorites_count.short_description = 'В избранном'
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            feed.publish(obj.id)
+        if 'image' in form.changed_data:
+            enqueue(
+                'recipes.process_image',
+                recipe_id=obj.id,
+                image=obj.image.name
+            )
+
+    def save_related(self, request, form, formsets, change):
+        shopping_list.subtract_recipe(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        shopping_list.add_recipe(form.instance.pk)
+        update_search_vectors(Recipe.objects.filter(pk=form.instance.pk))
 
     class Media:
         pass
@@ -90,6 +109,8 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
+    """Корзины с пересчетом списков покупок, как в API."""
+
     list_display = ('user', 'recipe', 'id')
     list_display_links = ('user', 'recipe')
     list_filter = (UserFilter, RecipeFilter)
@@ -99,9 +120,44 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         queryset = super().get_queryset(request)
         return queryset.select_related('user', 'recipe')
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            old = ShoppingCart.objects.get(pk=obj.pk)
+            shopping_list.subtract_recipe(old.recipe_id, old.user_id)
+        super().save_model(request, obj, form, change)
+        shopping_list.add_recipe(obj.recipe_id, obj.user_id)
+
+    def delete_model(self, request, obj):
+        shopping_list.subtract_recipe(obj.recipe_id, obj.user_id)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for user_id, recipe_id in queryset.values_list('user_id', 'recipe_id'):
+            shopping_list.subtract_recipe(recipe_id, user_id)
+        super().delete_queryset(request, queryset)
+
+
+@contextmanager
+def changing_recipes(recipe_ids):
+    """Пересчитывает зависящие от ингредиентов рецептов данные.
+
+    Ингредиенты вычитаются из списков покупок до изменения и прибавляются
+    после него, как в RecipeAdmin.save_related.
+    """
+    shopping_list.subtract_recipes(recipe_ids)
+    yield
+    shopping_list.add_recipes(recipe_ids)
+    # По времени изменения рецептов строится ключ кеша выгрузки
+    # списка покупок.
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    recipes.update(updated_at=timezone.now())
+    update_search_vectors(recipes)
+
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
+    """Ингредиенты рецептов с пересчетом списков покупок."""
+
     list_display = ('recipe', 'ingredient', 'amount')
     list_display_links = ('recipe', 'ingredient')
     list_filter = (RecipeFilter,)
@@ -110,3 +166,22 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         return queryset.select_related('recipe', 'ingredient')
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id}
+        if change:
+            recipe_ids.add(
+                RecipeIngredient.objects.get(pk=obj.pk).recipe_id
+            )
+        with changing_recipes(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with changing_recipes({obj.recipe_id}):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with changing_recipes(
+            set(queryset.values_list('recipe_id', flat=True))
+        ):
+            super().delete_queryset(request, queryset)
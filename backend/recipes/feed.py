@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from jobs.queue import enqueue
+from recipes.models import FeedItem, Recipe
+from users.models import Follow
+
+ADD_ITEMS_SQL = '''
+    INSERT INTO {items} (user_id, recipe_id, pub_date)
+    SELECT follow.user_id, recipe.id, recipe.pub_date
+    FROM {recipes} AS recipe
+    INNER JOIN {follows} AS follow ON follow.author_id = recipe.author_id
+    WHERE {condition}
+    ON CONFLICT (user_id, recipe_id) DO NOTHING
+'''
+
+
+def uses_timeline(user):
+    """Читать ли ленту пользователя из заранее собранной таблицы."""
+    return settings.FEED_TIMELINE and (
+        Follow.objects.filter(user=user).count()
+        >= settings.FEED_TIMELINE_MIN_FOLLOWING
+    )
+
+
+def get_feed(queryset, user):
+    """Рецепты авторов, на которых подписан пользователь.
+
+    Обычно это один запрос по индексу (author, pub_date) с подзапросом
+    подписок. Для пользователей с большим числом подписок лента читается
+    из FeedItem по индексу (user, pub_date). В обоих случаях дата для
+    сортировки и курсора лежит в аннотации feed_pub_date.
+    """
+    if uses_timeline(user):
+        return queryset.filter(feed_items__user=user).annotate(
+            feed_pub_date=F('feed_items__pub_date')
+        )
+    return queryset.filter(
+        author__in=Follow.objects.filter(user=user).values('author')
+    ).annotate(feed_pub_date=F('pub_date'))
+
+
+def add_items(condition, params):
+    """Добавляет в ленты рецепты подписок, подходящие под condition."""
+    sql = ADD_ITEMS_SQL.format(
+        items=FeedItem._meta.db_table,
+        recipes=Recipe._meta.db_table,
+        follows=Follow._meta.db_table,
+        condition=condition,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def fan_out(recipe_id):
+    """Добавляет рецепт в ленты всех подписчиков его автора."""
+    add_items('recipe.id = %s', [recipe_id])
+
+
+def publish(recipe_id):
+    """Ставит в очередь раскладку нового рецепта по лентам."""
+    if settings.FEED_TIMELINE:
+        enqueue('recipes.fan_out_recipe', recipe_id=recipe_id)
+
+
+def follow(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные рецепты автора."""
+    if settings.FEED_TIMELINE:
+        add_items(
+            'follow.user_id = %s AND follow.author_id = %s',
+            [user_id, author_id]
+        )
+
+
+def unfollow(user_id, author_id):
+    """Убирает рецепты автора из ленты бывшего подписчика."""
+    if settings.FEED_TIMELINE:
+        FeedItem.objects.filter(
+            user_id=user_id, recipe__author_id=author_id
+        ).delete()
+
+
+def find_mismatched_users():
+    """Пользователи, чья лента разошлась с подписками."""
+    expected = set(
+        Recipe.objects.filter(author__following__isnull=False).values_list(
+            'author__following__user', 'id'
+        ).order_by().iterator()
+    )
+    actual = set(
+        FeedItem.objects.values_list('user_id', 'recipe_id').iterator()
+    )
+    return {user_id for user_id, _ in expected ^ actual}
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты из подписок с нуля."""
+    items = FeedItem.objects.all()
+    condition = '1 = 1'
+    params = []
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        items = items.filter(user__in=user_ids)
+        condition = 'follow.user_id IN ({})'.format(
+            ', '.join(['%s'] * len(user_ids))
+        )
+        params = user_ids
+    items.delete()
+    return add_items(condition, params)
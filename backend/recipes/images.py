@@ -0,0 +1,107 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Поле модели -> (максимальный размер, формат, качество, суффикс файла).
+VARIANTS = {
+    'image_webp': (
+        settings.RECIPE_IMAGE_MAX_SIZE, 'WEBP',
+        settings.RECIPE_IMAGE_WEBP_QUALITY, '.webp'
+    ),
+    'thumbnail': (
+        settings.RECIPE_IMAGE_THUMBNAIL_SIZE, 'JPEG',
+        settings.RECIPE_IMAGE_QUALITY, '_thumb.jpg'
+    ),
+    'thumbnail_webp': (
+        settings.RECIPE_IMAGE_THUMBNAIL_SIZE, 'WEBP',
+        settings.RECIPE_IMAGE_WEBP_QUALITY, '_thumb.webp'
+    ),
+}
+
+
+def get_image_files(recipe):
+    """Имена всех файлов картинки рецепта в хранилище."""
+    return [
+        file.name
+        for file in (recipe.image, *(getattr(recipe, f) for f in VARIANTS))
+        if file
+    ]
+
+
+def open_image(file, size):
+    """Открывает изображение уже уменьшенным и правильно повернутым.
+
+    Для JPEG draft() просит декодер сразу уменьшить картинку кратно
+    двум, поэтому большие фотографии не разворачиваются в память целиком.
+    """
+    file.seek(0)
+    image = Image.open(file)
+    image.draft('RGB', size)
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail(size, Image.LANCZOS)
+    return image
+
+
+def encode_image(image, image_format, quality):
+    """Сохраняет изображение без метаданных (EXIF, ICC, комментариев)."""
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def save_variants(recipe, source):
+    """Пишет уменьшенные копии source в поля рецепта, удаляя старые."""
+    base_name = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    for field, (size, image_format, quality, suffix) in VARIANTS.items():
+        variant = getattr(recipe, field)
+        if variant:
+            variant.delete(save=False)
+        image = source.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        variant.save(
+            f'{base_name}{suffix}',
+            ContentFile(encode_image(image, image_format, quality)),
+            save=False
+        )
+
+
+def make_variants(recipe):
+    """Создает уменьшенные копии и WebP-версии картинки рецепта."""
+    with recipe.image.open('rb') as file:
+        source = open_image(file, settings.RECIPE_IMAGE_MAX_SIZE)
+    save_variants(recipe, source)
+    recipe.save(update_fields=[*VARIANTS, 'updated_at'])
+
+
+def process_image(recipe):
+    """Обрабатывает только что загруженную картинку рецепта.
+
+    Картинка поворачивается по EXIF, очищается от метаданных и
+    пересохраняется в JPEG не больше RECIPE_IMAGE_MAX_SIZE; исходный файл
+    удаляется. Декодирование выполняется один раз, копии получаются
+    из уже уменьшенного изображения.
+    """
+    original = recipe.image.name
+    with recipe.image.open('rb') as file:
+        source = open_image(file, settings.RECIPE_IMAGE_MAX_SIZE)
+    base_name = os.path.splitext(os.path.basename(original))[0]
+    recipe.image.save(
+        f'{base_name}.jpg',
+        ContentFile(
+            encode_image(source, 'JPEG', settings.RECIPE_IMAGE_QUALITY)
+        ),
+        save=False
+    )
+    save_variants(recipe, source)
+    recipe.save(update_fields=['image', *VARIANTS, 'updated_at'])
+    recipe.image.storage.delete(original)
@@ -1,43 +1,209 @@
+import csv
 import json
+import os
+import time
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
+from api.cache import INGREDIENTS, bump_versions_on_commit
 from recipes.models import Ingredient
 
+DEFAULT_PATH = 'data/ingredients.json'
+BATCH_SIZE = 1000
+READ_SIZE = 64 * 1024
 
-class Command(BaseCommand):
-    help = 'Load ingredients from JSON file'
 
-    def handle(self, *args, **kwargs):
-        try:
-            with open('data/ingredients.json', encoding='utf-8') as file:
-                data = json.load(file)
-                for item in data:
-                    Ingredient.objects.get_or_create(
-                        name=item['name'],
-                        measurement_unit=item['measurement_unit']
+def iter_json(file):
+    """Построчно разбирает JSON-массив объектов, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise json.JSONDecodeError(
+                        'Expected an array', buffer, position
                     )
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'], item['measurement_unit']
+        if not chunk:
+            raise json.JSONDecodeError('Unterminated array', buffer, position)
 
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Successfully loaded {len(data)} ingredients'
-                    )
-                )
-        except FileNotFoundError:
+
+def iter_csv(file):
+    """Строки CSV вида: название,единица измерения (заголовок необязателен)."""
+    for row in csv.reader(file):
+        if not row or row == ['name', 'measurement_unit']:
+            continue
+        yield row[0], row[1]
+
+
+READERS = {
+    'json': iter_json,
+    'csv': iter_csv,
+}
+
+
+class Command(BaseCommand):
+    help = 'Load ingredients from a JSON or CSV file in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=DEFAULT_PATH,
+            help=f'JSON or CSV file with ingredients (default {DEFAULT_PATH})'
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='File format, detected from the extension by default'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Parse the file and report changes without writing them'
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help=(
+                'Update the measurement unit of an existing ingredient with '
+                'the same name instead of adding a second one'
+            )
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
             self.stdout.write(
-                self.style.ERROR(
-                    'File data/ingredients.json not found'
-                )
+                self.style.ERROR(f'Unsupported file format: {path}')
             )
-        except json.JSONDecodeError:
+            return
+        try:
+            with open(path, encoding='utf-8') as file, transaction.atomic():
+                stats = self.load(READERS[file_format](file), options)
+        except FileNotFoundError:
+            self.stdout.write(self.style.ERROR(f'File {path} not found'))
+            return
+        except (json.JSONDecodeError, KeyError, IndexError) as e:
             self.stdout.write(
                 self.style.ERROR(
-                    'Invalid JSON format in data/ingredients.json'
+                    f'Invalid {file_format} format in {path}: {e}'
                 )
             )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(
-                    f'Error loading ingredients: {str(e)}'
+            return
+
+        prefix = 'Dry run: would have' if options['dry_run'] else (
+            'Successfully'
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{prefix} created {stats["created"]} and updated '
+                f'{stats["updated"]} of {stats["rows"]} ingredients '
+                f'({stats["duplicates"]} duplicates, '
+                f'{stats["rate"]:.0f} rows/s)'
+            )
+        )
+
+    def load(self, rows, options):
+        """Сверяет строки файла с базой и пишет изменения пачками.
+
+        Существующие пары (название, единица) загружаются одним запросом,
+        поэтому на каждую строку файла не приходится ни одного запроса.
+        """
+        existing = set()
+        name_ids = {}
+        for ingredient_id, name, measurement_unit in (
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        ):
+            existing.add((name, measurement_unit))
+            name_ids.setdefault(name, []).append(ingredient_id)
+        ids_by_name = {}
+        if options['upsert']:
+            ids_by_name = {
+                name: ids[0]
+                for name, ids in name_ids.items()
+                if len(ids) == 1
+            }
+
+        stats = {'rows': 0, 'created': 0, 'updated': 0, 'duplicates': 0}
+        seen = set()
+        to_create = []
+        to_update = []
+        started = time.monotonic()
+        for name, measurement_unit in rows:
+            stats['rows'] += 1
+            key = (name.strip(), measurement_unit.strip())
+            if key in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(key)
+            if key in existing:
+                continue
+            name, measurement_unit = key
+            if name in ids_by_name:
+                to_update.append(
+                    Ingredient(
+                        id=ids_by_name.pop(name),
+                        name=name,
+                        measurement_unit=measurement_unit
+                    )
+                )
+            else:
+                to_create.append(
+                    Ingredient(name=name, measurement_unit=measurement_unit)
                 )
+            if len(to_create) + len(to_update) >= BATCH_SIZE:
+                self.write_batch(to_create, to_update, stats, options)
+                self.report_progress(stats, started)
+        self.write_batch(to_create, to_update, stats, options)
+        stats['rate'] = stats['rows'] / max(time.monotonic() - started, 1e-6)
+        if not options['dry_run'] and (stats['created'] or stats['updated']):
+            # bulk_create и bulk_update не отправляют сигналы моделей.
+            bump_versions_on_commit(INGREDIENTS)
+        return stats
+
+    def write_batch(self, to_create, to_update, stats, options):
+        if not options['dry_run']:
+            Ingredient.objects.bulk_create(
+                to_create, batch_size=BATCH_SIZE, ignore_conflicts=True
+            )
+            Ingredient.objects.bulk_update(
+                to_update, ['measurement_unit'], batch_size=BATCH_SIZE
             )
+        stats['created'] += len(to_create)
+        stats['updated'] += len(to_update)
+        to_create.clear()
+        to_update.clear()
+
+    def report_progress(self, stats, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{stats["rows"]} rows processed, '
+            f'{stats["created"] + stats["updated"]} written '
+            f'({stats["rows"] / max(elapsed, 1e-6):.0f} rows/s)'
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+
+def count_related(model, field):
+    """Подзапрос с количеством строк model, ссылающихся на текущий объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized recipe and user counters'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            users = User.objects.update(
+                recipes_count=count_related(Recipe, 'author'),
+                followers_count=count_related(Follow, 'author'),
+            )
+            recipes = Recipe.objects.update(
+                favorites_count=count_related(Favorite, 'recipe'),
+                shopping_carts_count=count_related(ShoppingCart, 'recipe'),
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully rebuilt counters for {users} users '
+                f'and {recipes} recipes'
+            )
+        )
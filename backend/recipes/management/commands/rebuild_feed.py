@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import feed
+
+
+class Command(BaseCommand):
+    help = 'Check precomputed subscription feeds against follows and rebuild'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report users with inconsistent feeds'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user_ids = feed.find_mismatched_users()
+            if options['check']:
+                if user_ids:
+                    raise CommandError(
+                        f'Feeds of {len(user_ids)} users are inconsistent: '
+                        f'{sorted(user_ids)}'
+                    )
+                self.stdout.write(
+                    self.style.SUCCESS('All feeds are consistent')
+                )
+                return
+            rows = feed.rebuild(user_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully rebuilt feeds for {len(user_ids)} users '
+                f'({rows} rows)'
+            )
+        )
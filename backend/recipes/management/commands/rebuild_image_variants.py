@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import make_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails and WebP variants of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate variants that already exist'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.exclude(image='').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(thumbnail='')
+        processed = failed = 0
+        for recipe in queryset.iterator():
+            try:
+                make_variants(recipe)
+            except OSError as error:
+                failed += 1
+                self.stdout.write(
+                    self.style.ERROR(f'Recipe {recipe.id}: {error}')
+                )
+            else:
+                processed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully generated image variants for {processed} '
+                f'recipes ({failed} failed)'
+            )
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import is_search_supported, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recalculate full-text search vectors of all recipes'
+
+    def handle(self, *args, **kwargs):
+        queryset = Recipe.objects.all()
+        if not is_search_supported(queryset.db):
+            self.stdout.write(
+                self.style.ERROR(
+                    'Full-text search requires PostgreSQL'
+                )
+            )
+            return
+        updated = update_search_vectors(queryset)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully rebuilt search vectors for {updated} recipes'
+            )
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Check materialized shopping lists against carts and rebuild them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report users with inconsistent shopping lists'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user_ids = shopping_list.find_mismatched_users()
+            if options['check']:
+                if user_ids:
+                    raise CommandError(
+                        f'Shopping lists of {len(user_ids)} users are '
+                        f'inconsistent: {sorted(user_ids)}'
+                    )
+                self.stdout.write(
+                    self.style.SUCCESS('All shopping lists are consistent')
+                )
+                return
+            rows = shopping_list.rebuild(user_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully rebuilt shopping lists for {len(user_ids)} '
+                f'users ({rows} rows)'
+            )
+        )
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    User.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Follow, 'author'),
+    )
+    Recipe.objects.update(
+        favorites_count=count_related(Favorite, 'recipe'),
+        shopping_carts_count=count_related(ShoppingCart, 'recipe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
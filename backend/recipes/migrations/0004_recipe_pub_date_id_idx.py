@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ['-pub_date', '-id'], 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+        ),
+    ]
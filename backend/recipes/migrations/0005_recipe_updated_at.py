@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_pub_date(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(updated_at=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:01
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names')
+    )
+    Recipe.objects.update(
+        search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector('text', weight='B', config='russian')
+            + SearchVector(ingredient_names, weight='C', config='russian')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingListIngredient = apps.get_model(
+        'recipes', 'ShoppingListIngredient'
+    )
+    totals = RecipeIngredient.objects.filter(
+        recipe__shoppingcarts__isnull=False
+    ).values(
+        'recipe__shoppingcarts__user', 'ingredient'
+    ).annotate(total=models.Sum('amount')).order_by()
+    ShoppingListIngredient.objects.bulk_create(
+        (
+            ShoppingListIngredient(
+                user_id=row['recipe__shoppingcarts__user'],
+                ingredient_id=row['ingredient'],
+                amount=row['total']
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
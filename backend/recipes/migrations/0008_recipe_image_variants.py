@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shoppinglistingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/images/webp/', verbose_name='Картинка в WebP'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/images/thumbnails/', verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/images/thumbnails/', verbose_name='Миниатюра в WebP'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
@@ -73,6 +75,24 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Картинка'
     )
+    image_webp = models.ImageField(
+        upload_to='recipes/images/webp/',
+        blank=True,
+        editable=False,
+        verbose_name='Картинка в WebP'
+    )
+    thumbnail = models.ImageField(
+        upload_to='recipes/images/thumbnails/',
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюра'
+    )
+    thumbnail_webp = models.ImageField(
+        upload_to='recipes/images/thumbnails/',
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюра в WebP'
+    )
     text = models.TextField(
         verbose_name='Описание'
     )
@@ -95,11 +115,44 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -176,3 +229,78 @@ class ShoppingCart(BaseUserRecipeRelation):
     class Meta(BaseUserRecipeRelation.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class ShoppingListIngredient(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Поддерживается инкрементально при изменении корзины и состава
+    рецептов в ней, чтобы выгрузка списка читала готовые строки.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient'
+            )
+        ]
+
+
+class FeedItem(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Заполняется при публикации рецепта и при подписке, чтобы ленту
+    пользователей с большим числом подписок читать по одному индексу.
+    Дата публикации повторяет дату рецепта для сортировки ленты.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_item'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_item_user_pub_date_idx'
+            )
+        ]
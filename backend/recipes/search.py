@@ -0,0 +1,35 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import connections
+from django.db.models import OuterRef, Subquery
+
+from recipes.models import RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+
+
+def get_search_vector():
+    """Выражение поискового вектора по названию, описанию и ингредиентам."""
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def is_search_supported(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def update_search_vectors(queryset):
+    """Пересчитывает поисковые векторы рецептов одним запросом UPDATE."""
+    if not is_search_supported(queryset.db):
+        return 0
+    return queryset.update(search_vector=get_search_vector())
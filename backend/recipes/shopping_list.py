@@ -0,0 +1,133 @@
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Greatest
+
+from recipes.models import (
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListIngredient,
+)
+
+ADD_RECIPES_SQL = '''
+    INSERT INTO {items} (user_id, ingredient_id, amount)
+    SELECT cart.user_id, ri.ingredient_id, SUM(ri.amount)
+    FROM {cart} AS cart
+    INNER JOIN {recipe_ingredients} AS ri ON ri.recipe_id = cart.recipe_id
+    WHERE cart.recipe_id IN ({recipe_ids}) {user_filter}
+    GROUP BY cart.user_id, ri.ingredient_id
+    ON CONFLICT (user_id, ingredient_id)
+    DO UPDATE SET amount = {items}.amount + EXCLUDED.amount
+'''
+
+
+def add_recipes(recipe_ids, user_id=None):
+    """Прибавляет ингредиенты рецептов к спискам покупок.
+
+    Учитываются пользователи, у которых рецепт лежит в корзине
+    (или только user_id), поэтому вызывать нужно после добавления рецептов
+    в корзину или после записи новых ингредиентов рецепта.
+    """
+    params = list(recipe_ids)
+    if not params:
+        return
+    user_filter = ''
+    if user_id is not None:
+        user_filter = 'AND cart.user_id = %s'
+        params.append(user_id)
+    sql = ADD_RECIPES_SQL.format(
+        items=ShoppingListIngredient._meta.db_table,
+        cart=ShoppingCart._meta.db_table,
+        recipe_ingredients=RecipeIngredient._meta.db_table,
+        recipe_ids=', '.join(['%s'] * (len(params) - bool(user_filter))),
+        user_filter=user_filter,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def subtract_recipes(recipe_ids, user_id=None):
+    """Вычитает ингредиенты рецептов из списков покупок.
+
+    Вызывать нужно до удаления рецептов из корзины или до изменения
+    их ингредиентов. Строки с нулевым количеством удаляются.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    items = ShoppingListIngredient.objects.filter(
+        ingredient__ingredient_recipes__recipe_id__in=recipe_ids,
+        user__shoppingcarts__recipe_id__in=recipe_ids
+    )
+    if user_id is not None:
+        items = items.filter(user_id=user_id)
+    recipe_amount = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids,
+        recipe__shoppingcarts__user_id=OuterRef('user_id'),
+        ingredient_id=OuterRef('ingredient_id')
+    ).order_by().values('ingredient_id').annotate(
+        total=Sum('amount')
+    ).values('total')
+    items.update(amount=Greatest(F('amount') - Subquery(recipe_amount), 0))
+    items.filter(amount=0).delete()
+
+
+def add_recipe(recipe_id, user_id=None):
+    add_recipes([recipe_id], user_id)
+
+
+def subtract_recipe(recipe_id, user_id=None):
+    subtract_recipes([recipe_id], user_id)
+
+
+def get_totals(user_ids=None):
+    """Суммы ингредиентов по корзинам, посчитанные заново."""
+    totals = RecipeIngredient.objects.filter(
+        recipe__shoppingcarts__isnull=False
+    )
+    if user_ids is not None:
+        totals = totals.filter(recipe__shoppingcarts__user__in=user_ids)
+    return totals.values(
+        'recipe__shoppingcarts__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+
+
+def find_mismatched_users():
+    """Пользователи, чей список покупок разошелся с корзиной."""
+    expected = {
+        (row['recipe__shoppingcarts__user'], row['ingredient']): row['total']
+        for row in get_totals().iterator()
+    }
+    actual = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in (
+            ShoppingListIngredient.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            ).iterator()
+        )
+    }
+    return {
+        user_id
+        for user_id, ingredient_id in expected.keys() | actual.keys()
+        if expected.get((user_id, ingredient_id))
+        != actual.get((user_id, ingredient_id))
+    }
+
+
+def rebuild(user_ids=None):
+    """Пересобирает списки покупок из корзин с нуля."""
+    totals = get_totals(user_ids)
+    items = ShoppingListIngredient.objects.all()
+    if user_ids is not None:
+        items = items.filter(user__in=user_ids)
+    items.delete()
+    return len(ShoppingListIngredient.objects.bulk_create(
+        (
+            ShoppingListIngredient(
+                user_id=row['recipe__shoppingcarts__user'],
+                ingredient_id=row['ingredient'],
+                amount=row['total']
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000
+    ))
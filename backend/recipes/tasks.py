@@ -0,0 +1,27 @@
+from django.core.files.storage import default_storage
+
+from jobs.queue import task
+from recipes import feed
+from recipes.images import process_image
+from recipes.models import Recipe
+
+
+@task('recipes.process_image')
+def process_image_task(recipe_id, image):
+    """Обрабатывает картинку, если рецепт жив и картинку не заменили."""
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image).first()
+    if recipe is not None:
+        process_image(recipe)
+
+
+@task('recipes.delete_files')
+def delete_files(names):
+    """Удаляет из хранилища файлы удаленного или измененного рецепта."""
+    for name in names:
+        default_storage.delete(name)
+
+
+@task('recipes.fan_out_recipe')
+def fan_out_recipe(recipe_id):
+    """Раскладывает опубликованный рецепт по лентам подписчиков."""
+    feed.fan_out(recipe_id)
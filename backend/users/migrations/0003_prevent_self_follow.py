@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def delete_self_follows(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    self_follows = Follow.objects.filter(user=F('author'))
+    User.objects.filter(
+        pk__in=self_follows.values('author'), followers_count__gt=0
+    ).update(followers_count=F('followers_count') - 1)
+    self_follows.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_self_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(('user', models.F('author')), _negated=True), name='prevent_self_follow'),
+        ),
+    ]
@@ -25,6 +25,16 @@ class User(AbstractUser):
         blank=True,
         default=''
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -61,7 +71,11 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=['user', 'author'],
                 name='unique_follow'
-            )
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow'
+            ),
         ]
 
     def __str__(self):